@@ -0,0 +1,375 @@
+from sqlalchemy import MetaData, Table
+from java.sql import SQLException, Types
+from decimal import Decimal
+import os
+import shutil
+import tempfile
+import unittest
+import zxoracle
+
+# DatabaseMetaData rows for HR.LOCATIONS, whose COUNTRY_ID references
+# HR.COUNTRIES
+COLUMNS = {
+    'COUNTRIES': [
+        (None, 'HR', 'COUNTRIES', 'COUNTRY_ID', Types.CHAR, 'CHAR', 2, None,
+         None, 10, 0, None, None, None, None, 2, 1, 'NO'),
+        (None, 'HR', 'COUNTRIES', 'COUNTRY_NAME', Types.VARCHAR, 'VARCHAR2', 40,
+         None, None, 10, 1, None, None, None, None, 40, 2, 'YES')],
+    'LOCATIONS': [
+        (None, 'HR', 'LOCATIONS', 'LOCATION_ID', Types.INTEGER, 'NUMBER', 4,
+         None, 0, 10, 0, None, None, None, None, None, 1, 'NO'),
+        (None, 'HR', 'LOCATIONS', 'COUNTRY_ID', Types.CHAR, 'CHAR', 2, None,
+         None, 10, 1, None, None, None, None, 2, 2, 'YES')],
+}
+PRIMARY_KEYS = {
+    'COUNTRIES': [(None, 'HR', 'COUNTRIES', 'COUNTRY_ID', 1, 'COUNTRY_C_ID_PK')],
+    'LOCATIONS': [(None, 'HR', 'LOCATIONS', 'LOCATION_ID', 1, 'LOC_ID_PK')],
+}
+IMPORTED_KEYS = {
+    'COUNTRIES': [],
+    'LOCATIONS': [(None, 'HR', 'COUNTRIES', 'COUNTRY_ID', None, 'HR',
+                   'LOCATIONS', 'COUNTRY_ID', 1, None, 1, 'LOC_C_ID_FK',
+                   'COUNTRY_C_ID_PK', 7)],
+}
+
+# the same tables as rows of reflect_schema()'s data dictionary queries
+TAB_COLUMNS = [
+    ('COUNTRIES', 'COUNTRY_ID', 'CHAR', 2, None, None, 'N', None, 1, 2),
+    ('COUNTRIES', 'COUNTRY_NAME', 'VARCHAR2', 40, None, None, 'Y', None, 2, 40),
+    ('LOCATIONS', 'LOCATION_ID', 'NUMBER', 22, 4, 0, 'N', None, 1, 0),
+    ('LOCATIONS', 'COUNTRY_ID', 'CHAR', 2, None, None, 'Y', None, 2, 2),
+]
+PK_COLUMNS = [
+    ('COUNTRIES', 'COUNTRY_ID', 1, 'COUNTRY_C_ID_PK'),
+    ('LOCATIONS', 'LOCATION_ID', 1, 'LOC_ID_PK'),
+]
+FK_COLUMNS = [
+    ('LOCATIONS', 'COUNTRY_ID', 1, 'LOC_C_ID_FK', 'NO ACTION', 'NOT DEFERRABLE',
+     'IMMEDIATE', 'HR', 'COUNTRIES', 'COUNTRY_ID', 'COUNTRY_C_ID_PK'),
+]
+
+class FakeResult(list):
+    def scalar(self):
+        return self[0][0]
+
+class FakeResultSet(object):
+    # just enough of java.sql.ResultSet for zxoracle to read rows; like
+    # JDBC's, the primitive getters return 0 for NULL, and getDate drops
+    # the time of day.  'getters' records the getter used per column.
+    def __init__(self, rows, types=None):
+        self.rows = rows
+        self.columns = rows and len(rows[0]) or 0
+        self.types = types or [Types.VARCHAR] * self.columns
+        self.getters = {}
+        self.fetch_size = None
+        self.row = None
+        self.value = None
+        self.closed = False
+
+    def getMetaData(self):
+        return self
+
+    def getColumnCount(self):
+        return len(self.types)
+
+    def getColumnType(self, i):
+        return self.types[i - 1]
+
+    def setFetchSize(self, rows):
+        self.fetch_size = rows
+
+    def next(self):
+        if not self.rows:
+            return False
+        self.row = self.rows.pop(0)
+        return True
+
+    def _get(self, getter, i, null=None):
+        self.getters[i] = getter
+        self.value = self.row[i - 1]
+        if self.value is None:
+            return null
+        return self.value
+
+    def getString(self, i):
+        return self._get('getString', i)
+
+    def getObject(self, i):
+        return self._get('getObject', i)
+
+    def getInt(self, i):
+        return self._get('getInt', i, 0)
+
+    def getLong(self, i):
+        return self._get('getLong', i, 0L)
+
+    def getDouble(self, i):
+        return self._get('getDouble', i, 0.0)
+
+    def getBigDecimal(self, i):
+        return self._get('getBigDecimal', i)
+
+    def getTimestamp(self, i):
+        return self._get('getTimestamp', i)
+
+    def getDate(self, i):
+        value = self._get('getDate', i)
+        return value and value[:10]
+
+    def wasNull(self):
+        return self.value is None
+
+    def close(self):
+        self.closed = True
+
+class FakeMetaData(object):
+    def __init__(self):
+        self.calls = []
+
+    def _rows(self, name, rows, table):
+        self.calls.append((name, table))
+        return FakeResultSet(list(rows.get(table, [])))
+
+    def getColumns(self, catalog, schema, table, column):
+        return self._rows('getColumns', COLUMNS, table)
+
+    def getPrimaryKeys(self, catalog, schema, table):
+        return self._rows('getPrimaryKeys', PRIMARY_KEYS, table)
+
+    def getImportedKeys(self, catalog, schema, table):
+        return self._rows('getImportedKeys', IMPORTED_KEYS, table)
+
+class FakeConnection(object):
+    # stands in for both the SQLAlchemy connection and the zxJDBC one
+    def __init__(self, dialect):
+        self.dialect = dialect
+        self.metadata = FakeMetaData()
+        self.connection = self
+        self.__connection__ = self
+        self.info = {}
+        self.queries = []
+
+    def connect(self):
+        return self
+
+    def execute(self, statement, *params):
+        self.queries.append(statement)
+        if 'from dual' in statement.lower():
+            return FakeResult([('HR',)])
+        if 'all_tab_columns' in statement:
+            return FakeResult(TAB_COLUMNS)
+        if "constraint_type = 'P'" in statement:
+            return FakeResult(PK_COLUMNS)
+        return FakeResult(FK_COLUMNS)
+
+    def getMetaData(self):
+        return self.metadata
+
+    def reflecttable(self, table, include_columns=None):
+        self.dialect.reflecttable(self, table, include_columns)
+
+class Dialect(zxoracle.ZXOracleDialect):
+    def ddl_timestamp(self, saconn, schema):
+        return '2009-01-01 00:00:00'
+
+class ReflectionCacheTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp(prefix='zxoracle-')
+        self.path = os.path.join(self.directory, 'schema.cache')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def reflect(self, cache):
+        dialect = Dialect()
+        dialect.reflection_cache = cache
+        conn = FakeConnection(dialect)
+        locations = Table('locations', MetaData(), autoload=True,
+                          autoload_with=conn)
+        return locations, conn.metadata.calls
+
+    def assertForeignKey(self, locations):
+        fks = list(locations.foreign_keys)
+        self.assertEqual(len(fks), 1)
+        self.assertEqual(fks[0].parent.name, 'country_id')
+        self.assertEqual(fks[0].column.table.name, 'countries')
+        self.assertEqual(fks[0].column.name, 'country_id')
+        self.assertEqual(fks[0].constraint.name, 'LOC_C_ID_FK')
+
+    def test_foreign_keys(self):
+        locations, calls = self.reflect(None)
+        self.assertForeignKey(locations)
+        self.assertEqual([c.name for c in locations.primary_key],
+                         ['location_id'])
+        self.assertEqual(len(calls), 6)
+
+    def test_cached_foreign_keys(self):
+        cache = zxoracle.ReflectionCache()
+        self.reflect(cache)
+        locations, calls = self.reflect(cache)
+        self.assertForeignKey(locations)
+        self.assertEqual(calls, [])
+        self.assertEqual((cache.hits, cache.misses), (2, 2))
+
+    def test_saved_foreign_keys(self):
+        cache = zxoracle.ReflectionCache(self.path)
+        self.reflect(cache)
+        cache.save()
+        locations, calls = self.reflect(zxoracle.ReflectionCache(self.path))
+        self.assertForeignKey(locations)
+        self.assertEqual(calls, [])
+
+class ReflectSchemaTestCase(unittest.TestCase):
+
+    def check_schema(self, schema, queries):
+        dialect = Dialect()
+        conn = FakeConnection(dialect)
+        metadata = MetaData()
+        tables = dialect.reflect_schema(conn, metadata, schema)
+        self.assertEqual([t.name for t in tables], ['countries', 'locations'])
+        countries, locations = tables
+        fks = list(locations.foreign_keys)
+        self.assertEqual(len(fks), 1)
+        self.assert_(fks[0].column is countries.c.country_id)
+        self.assertEqual(sorted(metadata.tables), sorted([t.key for t in tables]))
+        self.assertEqual(conn.metadata.calls, [])
+        self.assertEqual(len(conn.queries), queries)
+        self.assertEqual(dialect.reflection_cache, None)
+
+    def test_default_schema(self):
+        self.check_schema(None, 4)
+
+    def test_named_schema(self):
+        self.check_schema('hr', 3)
+
+class FakeStatement(object):
+    # a PreparedStatement whose executeBatch() returns 'counts' in turn
+    def __init__(self, counts):
+        self.counts = counts
+        self.params = {}
+        self.batches = [[]]
+        self.closed = False
+
+    def addBatch(self):
+        self.batches[-1].append(self.params)
+        self.params = {}
+
+    def executeBatch(self):
+        self.batches.append([])
+        counts = self.counts.pop(0)
+        if isinstance(counts, Exception):
+            raise counts
+        return counts
+
+    def close(self):
+        self.closed = True
+
+class FakeDataHandler(object):
+    def setJDBCObject(self, stmt, index, value):
+        stmt.params[index] = value
+
+class FakeCursor(object):
+    def __init__(self, stmt):
+        self.stmt = stmt
+        self.connection = self
+        self.__connection__ = self
+        self.datahandler = FakeDataHandler()
+
+    def prepareStatement(self, statement):
+        return self.stmt
+
+class FakeDBAPI(object):
+    paramstyle = 'qmark'
+
+    class DatabaseError(Exception):
+        pass
+
+class FakeBatchUpdateException(SQLException):
+    def getMessage(self):
+        return 'ORA-00001: unique constraint violated'
+
+    def getErrorCode(self):
+        return 1
+
+    def getSQLState(self):
+        return '23000'
+
+class FakeContext(object):
+    _rowcount = None
+
+class ExecuteManyTestCase(unittest.TestCase):
+
+    def executemany(self, counts, parameters):
+        dialect = Dialect(dbapi=FakeDBAPI)
+        dialect.jdbc_batch_size = 2
+        stmt = FakeStatement(counts)
+        context = FakeContext()
+        try:
+            dialect.do_executemany(FakeCursor(stmt), 'insert', parameters,
+                                   context)
+        finally:
+            self.assert_(stmt.closed)
+        return context._rowcount, stmt.batches[:-1]
+
+    def test_update_counts(self):
+        rowcount, batches = self.executemany([[1, 1], [1]],
+                                             [(1, 'a'), (2, 'b'), (3, 'c')])
+        self.assertEqual(rowcount, 3)
+        self.assertEqual(batches, [[{1: 1, 2: 'a'}, {1: 2, 2: 'b'}],
+                                   [{1: 3, 2: 'c'}]])
+
+    def test_success_no_info(self):
+        # the Oracle driver's answer for prepared statements
+        rowcount, batches = self.executemany([[1, -2], [1]],
+                                             [(1,), (2,), (3,)])
+        self.assertEqual(rowcount, -1)
+        self.assertEqual(len(batches), 2)
+
+    def test_execute_failed(self):
+        self.assertRaises(FakeDBAPI.DatabaseError, self.executemany,
+                          [[1, -3]], [(1,), (2,)])
+
+    def test_batch_update_exception(self):
+        self.assertRaises(FakeDBAPI.DatabaseError, self.executemany,
+                          [[1, 1], FakeBatchUpdateException()],
+                          [(1,), (2,), (3,)])
+
+class RowReaderTestCase(unittest.TestCase):
+
+    def test_typed_getters(self):
+        # how the Oracle driver describes NUMBER, NUMBER(9), DATE and
+        # TIMESTAMP columns
+        types = [Types.NUMERIC, Types.INTEGER, Types.DATE, Types.TIMESTAMP,
+                 Types.INTEGER, Types.NUMERIC, Types.DATE]
+        rs = FakeResultSet([
+            (Decimal('2.50'), 7, '2009-01-02 03:04:05',
+             '2009-01-02 03:04:05.123', None, None, None)], types)
+        self.assertEqual(list(zxoracle._jdbc_rows(rs)), [
+            (Decimal('2.50'), 7, '2009-01-02 03:04:05',
+             '2009-01-02 03:04:05.123', None, None, None)])
+        self.assertEqual(rs.getters, {
+            1: 'getBigDecimal', 2: 'getInt', 3: 'getTimestamp',
+            4: 'getTimestamp', 5: 'getInt', 6: 'getBigDecimal',
+            7: 'getTimestamp'})
+        self.assert_(rs.closed)
+
+    def test_fetch_size_and_laziness(self):
+        rs = FakeResultSet([('a',), ('b',), ('c',)])
+        rows = zxoracle._jdbc_rows(rs, 50)
+        self.assertEqual(rows.next(), ('a',))
+        self.assertEqual(rs.fetch_size, 50)
+        # the rest are only read as they're asked for
+        self.assertEqual(len(rs.rows), 2)
+        self.assert_(not rs.closed)
+        self.assertEqual(list(rows), [('b',), ('c',)])
+        self.assert_(rs.closed)
+
+    def test_driver_fetch_size(self):
+        rs = FakeResultSet([('a',)])
+        self.assertEqual(list(zxoracle._jdbc_rows(rs)), [('a',)])
+        self.assertEqual(rs.fetch_size, None)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -7,16 +7,32 @@
 # URL.get_dialect = get_dialect
 # 
 # (make the obvious changes if you actually need to use other dialects at the same time)
-
-
+#
+# to avoid reflecting the same tables over and over, and (with a path) on
+# every start:
+#
+# zxoracle.dialect.reflection_cache = zxoracle.ReflectionCache('schema.cache')
+#
+# and to reflect a whole schema with three queries rather than three
+# metadata calls per table:
+#
+# engine.dialect.reflect_schema(connection, metadata, 'hr')
+
+from __future__ import with_statement
+import atexit
+import cPickle
+import decimal
+import os
 import re
+import threading
 
 from sqlalchemy import util, exc, sql, schema as schema
 from sqlalchemy.engine import base, default
 from sqlalchemy.databases import oracle as _oracle
 from sqlalchemy import types as sqltypes
 
-from java.sql import Types as jdbctypes
+from java.math import BigDecimal
+from java.sql import DatabaseMetaData, SQLException, Statement, Types as jdbctypes
 
 # todo normalize/denormalize from oracle.py
 
@@ -50,23 +66,266 @@ sa_types = {
     jdbctypes.VARCHAR : sqltypes.String,
 }
 
+# the ResultSet getter for a column, by the SQLAlchemy type sa_types maps
+# its JDBC type to, and whether it returns a primitive that needs a
+# wasNull() check; anything else is read with getObject()
+_sa_getters = {
+    sqltypes.Integer: ('getInt', True),
+    sqltypes.Smallinteger: ('getInt', True),
+    sqltypes.Numeric: ('getBigDecimal', False),
+    sqltypes.Float: ('getDouble', True),
+    sqltypes.Boolean: ('getBoolean', True),
+    sqltypes.CHAR: ('getString', False),
+    sqltypes.String: ('getString', False),
+    sqltypes.Date: ('getDate', False),
+    sqltypes.Time: ('getTime', False),
+    sqltypes.DateTime: ('getTimestamp', False),
+    sqltypes.Binary: ('getBytes', False),
+}
+# JDBC types that don't follow their SQLAlchemy type: BIGINT overflows
+# getInt, Oracle's DATE has a time of day that getDate would drop, and
+# LOBs are left to getObject so they're not read eagerly
+_jdbc_getters = {
+    jdbctypes.BIGINT: ('getLong', True),
+    jdbctypes.DATE: ('getTimestamp', False),
+    jdbctypes.LONGVARCHAR: ('getString', False),
+    jdbctypes.BLOB: ('getObject', False),
+}
+_read_plans = {} # column types -> [(getter, primitive)]
+
+def _read_plan(column_types):
+    try:
+        return _read_plans[column_types]
+    except KeyError:
+        plan = []
+        for jdbc_type in column_types:
+            getter = _jdbc_getters.get(jdbc_type)
+            if getter is None:
+                getter = _sa_getters.get(sa_types.get(jdbc_type), ('getObject', False))
+            plan.append(getter)
+        _read_plans[column_types] = plan
+        return plan
+
+def _column_reader(get, i, was_null):
+    if was_null is None:
+        def read():
+            return get(i)
+    else:
+        def read():
+            value = get(i)
+            if was_null():
+                return None
+            return value
+    return read
+
+def _row_reader(rs):
+    # a function returning rs's current row as a tuple, reading each
+    # column with the getter for its type
+    rsmeta = rs.getMetaData()
+    column_types = tuple([rsmeta.getColumnType(i)
+                          for i in xrange(1, rsmeta.getColumnCount() + 1)])
+    readers = []
+    for i, (getter, primitive) in enumerate(_read_plan(column_types)):
+        readers.append(_column_reader(getattr(rs, getter), i + 1,
+                                      primitive and rs.wasNull or None))
+    def read_row():
+        return tuple([read() for read in readers])
+    return read_row
+
 def _jdbc_metadata(saconn):
     return saconn.connection.__connection__.getMetaData()
-def _jdbc_row(rs):
-    rsmeta = rs.getMetaData()
-    size = rsmeta.getColumnCount()
-    return tuple([rs.getObject(i) for i in xrange(1, size + 1)])
-def _jdbc_fetchall(rs):
-    def generate_rows():
+def _jdbc_rows(rs, fetch_size=None):
+    # yield the rows as tuples while they're read, fetch_size rows per
+    # round trip (the driver's default if None), then close rs
+    try:
+        if fetch_size:
+            rs.setFetchSize(fetch_size)
+        read_row = _row_reader(rs)
         while rs.next():
-            yield rs
-    return [_jdbc_row(rs) for rs in generate_rows()]
+            yield read_row()
+    finally:
+        rs.close()
+
+def _add_counts(rowcount, counts):
+    # add executeBatch's update counts to rowcount; -1 means unknown
+    if rowcount < 0:
+        return rowcount
+    for count in counts:
+        if count < 0: # Statement.SUCCESS_NO_INFO
+            return -1
+        rowcount += count
+    return rowcount
+
+def _plain(value):
+    # metadata as Python values, so it can be pickled
+    if value is None or isinstance(value, (basestring, int, long, float)):
+        return value
+    if isinstance(value, BigDecimal):
+        if value.scale() <= 0:
+            return int(value.longValue())
+        return value.doubleValue()
+    if isinstance(value, decimal.Decimal):
+        if value == value.to_integral():
+            return int(value)
+        return float(value)
+    return unicode(value.toString())
+def _plain_rows(rs, fetch_size=None):
+    return [tuple([_plain(value) for value in row])
+            for row in _jdbc_rows(rs, fetch_size)]
+
+class ReflectionCache(object):
+    """Remember the DatabaseMetaData rows reflecttable() reads for each
+    (schema, table), so each table costs its metadata round trips once.
+
+    If 'path' is given, the cache is loaded from that file and saved
+    back to it at exit (or by save()), so warm starts skip the round
+    trips too.  The tables a snapshot holds for a schema are only used
+    if the schema's DDL timestamp, which is checked once per schema per
+    run, hasn't changed since; for a dialect that can't report one, only
+    the in-memory cache is used.  Call invalidate() after changing
+    tables while the application runs.  Missing tables aren't cached.
+    """
+    def __init__(self, path=None):
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._tables = {}       # (schema, table) -> (columns, pks, fks)
+        self._ddl_times = {}    # schema -> DDL timestamp of its tables
+        self._checked = set()   # schemas whose timestamp was checked this run
+        self._complete = set()  # schemas with every table cached
+        self._dirty = False
+        self._lock = threading.Lock()
+        if path is not None:
+            self._load()
+            atexit.register(self.save)
+
+    def lookup(self, dialect, saconn, schema, table, load):
+        """Return the metadata rows for 'table', calling load() for them
+        if they aren't cached."""
+        key = (schema, table)
+        with self._lock:
+            if schema not in self._checked:
+                self._check(dialect.ddl_timestamp(saconn, schema), schema)
+            entry = self._tables.get(key)
+            if entry is not None:
+                self.hits += 1
+                return entry
+            self.misses += 1
+        entry = load()
+        if entry[0]:
+            with self._lock:
+                self._tables[key] = entry
+                self._dirty = True
+        return entry
+
+    def lookup_schema(self, dialect, saconn, schema, load):
+        """Make sure every table in 'schema' is cached, calling load()
+        for a dict of table -> rows if they aren't, and return the names
+        of the tables."""
+        with self._lock:
+            if schema not in self._checked:
+                self._check(dialect.ddl_timestamp(saconn, schema), schema)
+            if schema in self._complete:
+                self.hits += 1
+                return self._table_names(schema)
+            self.misses += 1
+        tables = load()
+        with self._lock:
+            for table, entry in tables.iteritems():
+                self._tables[(schema, table)] = entry
+            self._complete.add(schema)
+            self._dirty = True
+            return self._table_names(schema)
+
+    def invalidate(self, schema=None, table=None):
+        """Forget 'table', or every table in 'schema', or everything."""
+        with self._lock:
+            for key in self._tables.keys():
+                if ((schema is None or key[0] == schema) and
+                        (table is None or key[1] == table)):
+                    del self._tables[key]
+                    self._complete.discard(key[0])
+                    self._dirty = True
+
+    def save(self):
+        """Write the cache to its path, if it has changed."""
+        if self.path is None:
+            return
+        with self._lock:
+            if not self._dirty:
+                return
+            # tables of a schema without a timestamp can't be validated
+            ddl_times = dict([(schema, timestamp) for schema, timestamp
+                              in self._ddl_times.iteritems()
+                              if timestamp is not None])
+            tables = dict([(key, entry) for key, entry in self._tables.iteritems()
+                           if key[0] in ddl_times])
+            complete = set([schema for schema in self._complete
+                            if schema in ddl_times])
+            tmp = self.path + '.tmp'
+            f = open(tmp, 'wb')
+            try:
+                cPickle.dump({'ddl_times': ddl_times, 'tables': tables,
+                              'complete': complete},
+                             f, cPickle.HIGHEST_PROTOCOL)
+            finally:
+                f.close()
+            if os.path.exists(self.path):
+                os.remove(self.path)
+            os.rename(tmp, self.path)
+            self._dirty = False
+
+    # _lock must be held, apart from in _load which runs before the
+    # cache is shared
+
+    def _check(self, timestamp, schema):
+        self._checked.add(schema)
+        if timestamp is None or timestamp != self._ddl_times.get(schema):
+            for key in self._tables.keys():
+                if key[0] == schema:
+                    del self._tables[key]
+            self._complete.discard(schema)
+            self._ddl_times[schema] = timestamp
+            self._dirty = True
+
+    def _load(self):
+        try:
+            f = open(self.path, 'rb')
+        except IOError:
+            return
+        try:
+            try:
+                snapshot = cPickle.load(f)
+            except (EOFError, cPickle.UnpicklingError):
+                return
+        finally:
+            f.close()
+        self._ddl_times = snapshot['ddl_times']
+        self._tables = snapshot['tables']
+        self._complete = snapshot.get('complete', set())
+
+    def _table_names(self, schema):
+        return sorted([key[1] for key in self._tables if key[0] == schema])
+
+# the (dialect, cache) reflect_schema() is loading tables from, per thread
+_schema_load = threading.local()
 
 class JDBCDialect(object):
     supports_alter = True
     supports_unicode_statements = True
     supports_sane_rowcount = True
+    # executeBatch may report SUCCESS_NO_INFO rather than update counts
+    # (the Oracle driver does for prepared statements), which leaves
+    # executemany's rowcount at -1
+    supports_sane_multi_rowcount = False
     default_paramstyle = 'qmark'
+    reflection_cache = None
+    # rows per round trip when reading DatabaseMetaData results; the
+    # Oracle driver's default is 10
+    jdbc_fetch_size = 500
+    # parameter sets per executeBatch round trip in do_executemany; 0
+    # leaves executemany to zxJDBC, which takes a round trip per set
+    jdbc_batch_size = 1000
 
     def dbapi(cls):
         from com.ziclix.python.sql import zxJDBC
@@ -82,10 +341,51 @@ class JDBCDialect(object):
     def do_executemany(self, cursor, statement, parameters, context=None):
         if parameters == {}:
             parameters = ()
-        rowcount = cursor.executemany(statement, parameters)
+        if self.jdbc_batch_size:
+            rowcount = self._execute_batch(cursor, statement, parameters)
+        else:
+            rowcount = cursor.executemany(statement, parameters)
         if context is not None:
             context._rowcount = rowcount
 
+    def _execute_batch(self, cursor, statement, parameters):
+        # run statement once per parameter set, sending jdbc_batch_size
+        # sets per round trip, and return the total update count, or -1
+        # if the driver doesn't report them all
+        stmt = cursor.connection.__connection__.prepareStatement(statement)
+        set_object = cursor.datahandler.setJDBCObject
+        batch_size = self.jdbc_batch_size
+        def execute(rowcount):
+            counts = stmt.executeBatch()
+            # a driver that carries on past a failed statement may report
+            # it here instead of raising BatchUpdateException
+            if Statement.EXECUTE_FAILED in counts:
+                raise self.dbapi.DatabaseError(
+                    'executeBatch: statement %d of the batch failed' %
+                    (list(counts).index(Statement.EXECUTE_FAILED) + 1))
+            return _add_counts(rowcount, counts)
+        rowcount = 0
+        try:
+            try:
+                pending = 0
+                for params in parameters:
+                    for i, value in enumerate(params):
+                        set_object(stmt, i + 1, value)
+                    stmt.addBatch()
+                    pending += 1
+                    if pending == batch_size:
+                        rowcount = execute(rowcount)
+                        pending = 0
+                if pending:
+                    rowcount = execute(rowcount)
+            except SQLException, e:
+                raise self.dbapi.DatabaseError('%s [SQLCode: %d], [SQLState: %s]' %
+                                               (e.getMessage(), e.getErrorCode(),
+                                                e.getSQLState()))
+        finally:
+            stmt.close()
+        return rowcount
+
     def do_execute(self, cursor, statement, parameters, context=None):
         if parameters == {}:
             parameters = ()
@@ -100,20 +400,48 @@ class JDBCDialect(object):
     def table_names(self, saconn, schema):
         meta = _jdbc_metadata(saconn)
         rs = meta.getTables(None, schema, '%', None)
-        return [self._normalize_name(row[2]) for row in _jdbc_fetchall(rs)]
+        return [self._normalize_name(row[2])
+                for row in _jdbc_rows(rs, self.jdbc_fetch_size)]
 
-    def reflecttable(self, saconn, table, include_columns):
+    def ddl_timestamp(self, saconn, schema):
+        """Return a value that changes whenever a table in 'schema' is
+        created, altered or dropped, or None if there's no way to tell."""
+        return None
+
+    def _reflect_rows(self, saconn, ora_schema, ora_tablename):
         # see http://java.sun.com/j2se/1.4.2/docs/api/java/sql/DatabaseMetaData.html
         meta = _jdbc_metadata(saconn)
+        fetch_size = self.jdbc_fetch_size
+        columns = _plain_rows(meta.getColumns(None, ora_schema, ora_tablename, None),
+                              fetch_size)
+        if not columns:
+            return [], [], []
+        pks = _plain_rows(meta.getPrimaryKeys(None, ora_schema, ora_tablename),
+                          fetch_size)
+        fks = _plain_rows(meta.getImportedKeys(None, ora_schema, ora_tablename),
+                          fetch_size)
+        return columns, pks, fks
+
+    def reflecttable(self, saconn, table, include_columns):
         ora_tablename = self._denormalize_name(table.name)
         ora_schema = self._denormalize_name(table.schema)
+        def load():
+            return self._reflect_rows(saconn, ora_schema, ora_tablename)
+        cache = self.reflection_cache
+        loading = getattr(_schema_load, 'loading', None)
+        if loading is not None and loading[0] is self:
+            cache = loading[1]
+        if cache is None:
+            columns, pk_rows, fk_rows = load()
+        else:
+            columns, pk_rows, fk_rows = cache.lookup(
+                self, saconn, ora_schema, ora_tablename, load)
 
         # load columns
-        rs = meta.getColumns(None, ora_schema, ora_tablename, None)
-        while rs.next():
+        for row in columns:
             catalog, _, _, raw_colname, java_data_type, data_type, \
                 column_size, _, decimal_digits, radix, _, remarks, \
-                default, _, _, char_length, position, is_nullable = _jdbc_row(rs)
+                default, _, _, char_length, position, is_nullable = row
             nullable = is_nullable == 'YES'
             colname = self._normalize_name(raw_colname)
 
@@ -141,8 +469,7 @@ class JDBCDialect(object):
             raise AssertionError("Couldn't find any column information for table %s" % table.name)
 
         # load PK
-        rs = meta.getPrimaryKeys(None, ora_schema, ora_tablename)
-        rows = _jdbc_fetchall(rs)
+        rows = list(pk_rows)
         rows.sort(key=lambda row: row[-2]) # sort by key_seq
         for catalog, _, _, raw_colname, key_seq, pk_name in rows:
              colname = self._normalize_name(raw_colname)
@@ -150,8 +477,7 @@ class JDBCDialect(object):
         
         # load FKs
         fks = {}
-        rs = meta.getImportedKeys(None, ora_schema, ora_tablename)
-        rows = _jdbc_fetchall(rs)
+        rows = list(fk_rows)
         rows.sort(key=lambda row: (row[11], row[8])) # sort by fk, key_seq
         for row in rows:
             # [None, 'HR', 'COUNTRIES', 'COUNTRY_ID', None, 'HR', 'LOCATIONS', 'COUNTRY_ID', 1, None, 1, 'LOC_C_ID_FK', 'COUNTRY_C_ID_PK', 7]
@@ -180,8 +506,8 @@ class JDBCDialect(object):
                 refspec =  ".".join([fk_schema, fk_tablename, fk_colname])
                 t = schema.Table(fk_tablename, table.metadata, autoload=True, autoload_with=saconn, schema=fk_schema, useexisting=True)
             else:
-                refspec =  ".".join([fk_tablename, fk_colname])
-                t = schema.Table(fk_tablename, table.metadata, autoload=True, autoload_with=saconn, useexisting=True)
+                refspec =  ".".join([x for x in [table.schema, fk_tablename, fk_colname] if x])
+                t = schema.Table(fk_tablename, table.metadata, autoload=True, autoload_with=saconn, schema=table.schema, useexisting=True)
 
             if colname not in fk[0]:
                 fk[0].append(colname)
@@ -194,12 +520,36 @@ class JDBCDialect(object):
     def has_table(self, saconn, table_name, schema=None):
         meta = _jdbc_metadata(saconn)
         rs = meta.getTables(None, schema, self._denormalize_name(table_name), None)
-        return rs.next()
+        try:
+            return rs.next()
+        finally:
+            rs.close()
 
     def type_descriptor(self, typeobj):
         return sqltypes.adapt_type(typeobj, self._colspecs)
 
 
+# the JDBC types the Oracle driver reports for data dictionary type names,
+# with any "(n)" removed
+_oracle_jdbc_types = {
+    'BINARY_DOUBLE': jdbctypes.DOUBLE,
+    'BINARY_FLOAT': jdbctypes.REAL,
+    'BLOB': jdbctypes.BLOB,
+    'CHAR': jdbctypes.CHAR,
+    'CLOB': jdbctypes.CLOB,
+    'DATE': jdbctypes.TIMESTAMP,
+    'FLOAT': jdbctypes.FLOAT,
+    'LONG': jdbctypes.LONGVARCHAR,
+    'LONG RAW': jdbctypes.LONGVARBINARY,
+    'NCHAR': jdbctypes.CHAR,
+    'NCLOB': jdbctypes.CLOB,
+    'NUMBER': jdbctypes.DECIMAL,
+    'NVARCHAR2': jdbctypes.VARCHAR,
+    'RAW': jdbctypes.VARBINARY,
+    'TIMESTAMP': jdbctypes.TIMESTAMP,
+    'VARCHAR2': jdbctypes.VARCHAR,
+}
+
 class ZXOracleDialect(JDBCDialect, default.DefaultDialect):
     """Details of the Oracle dialect.  Not used directly in application code."""
     max_identifier_length = 30
@@ -249,6 +599,125 @@ class ZXOracleDialect(JDBCDialect, default.DefaultDialect):
         cursor = connection.execute("""select sequence_name from all_sequences where sequence_name=?""", self._denormalize_name(sequence_name))
         return cursor.fetchone() is not None
 
+    def ddl_timestamp(self, connection, schema):
+        # dropping a table other than the newest leaves max(last_ddl_time)
+        # as it was, but not the number of tables
+        s = ("select to_char(max(last_ddl_time), 'YYYY-MM-DD HH24:MI:SS') "
+             "|| ' ' || count(*) "
+             "from all_objects where owner = ? and object_type in ('TABLE', 'VIEW')")
+        return connection.execute(s, self._owner(connection, schema)).scalar()
+
+    def reflect_schema(self, connection, metadata, schema_name=None, only=None):
+        """Reflect the tables of 'schema_name' (or just those named in 'only')
+        into 'metadata' and return them.
+
+        Rather than three DatabaseMetaData calls per table, the columns,
+        primary keys and foreign keys of the whole schema are read with
+        three data dictionary queries, and reflecttable() then takes each
+        table's rows, and those of the tables their foreign keys refer
+        to, from the reflection cache.  Without a reflection_cache on the
+        dialect, the rows are only kept for this call.
+        """
+        cache = self.reflection_cache
+        if cache is None:
+            cache = ReflectionCache()
+        ora_schema = self._denormalize_name(schema_name)
+        def load():
+            return self._schema_rows(connection, ora_schema)
+        names = cache.lookup_schema(self, connection, ora_schema, load)
+        if only is None:
+            only = [self._normalize_name(name) for name in names]
+        previous = getattr(_schema_load, 'loading', None)
+        _schema_load.loading = (self, cache)
+        try:
+            return [schema.Table(name, metadata, autoload=True,
+                                 autoload_with=connection, schema=schema_name,
+                                 useexisting=True)
+                    for name in only]
+        finally:
+            _schema_load.loading = previous
+
+    def _owner(self, connection, ora_schema):
+        return ora_schema or self.get_default_schema_name(connection)
+
+    def _schema_rows(self, connection, ora_schema):
+        # the rows getColumns, getPrimaryKeys and getImportedKeys would
+        # give for each table in the schema, as a dict of
+        # table -> (columns, pks, fks)
+        owner = self._owner(connection, ora_schema)
+        tables = {}
+
+        cursor = connection.execute(
+            "select table_name, column_name, data_type, data_length, "
+            "data_precision, data_scale, nullable, data_default, column_id, "
+            "char_length from all_tab_columns where owner = ? "
+            "order by table_name, column_id", owner)
+        for table_name, column_name, data_type, data_length, precision, \
+                scale, nullable, data_default, column_id, char_length in cursor:
+            java_data_type = _oracle_jdbc_types.get(re.sub(r'\(\d+\)', '', data_type))
+            if precision is not None:
+                column_size = precision
+            else:
+                column_size = char_length or data_length
+            row = (None, owner, table_name, column_name, java_data_type,
+                   data_type, column_size, None, scale, 10,
+                   nullable == 'Y' and 1 or 0, None, data_default, None, None,
+                   char_length, column_id, nullable == 'Y' and 'YES' or 'NO')
+            tables.setdefault(table_name, ([], [], []))[0].append(
+                tuple([_plain(value) for value in row]))
+
+        cursor = connection.execute(
+            "select cc.table_name, cc.column_name, cc.position, c.constraint_name "
+            "from all_constraints c, all_cons_columns cc "
+            "where c.owner = ? and c.constraint_type = 'P' "
+            "and cc.owner = c.owner and cc.constraint_name = c.constraint_name",
+            owner)
+        for table_name, column_name, position, constraint_name in cursor:
+            if table_name in tables:
+                row = (None, owner, table_name, column_name, position,
+                       constraint_name)
+                tables[table_name][1].append(tuple([_plain(value) for value in row]))
+
+        cursor = connection.execute(
+            "select c.table_name, cc.column_name, cc.position, c.constraint_name, "
+            "c.delete_rule, c.deferrable, c.deferred, "
+            "rc.owner, rc.table_name, rcc.column_name, rc.constraint_name "
+            "from all_constraints c, all_cons_columns cc, "
+            "all_constraints rc, all_cons_columns rcc "
+            "where c.owner = ? and c.constraint_type = 'R' "
+            "and cc.owner = c.owner and cc.constraint_name = c.constraint_name "
+            "and rc.owner = c.r_owner and rc.constraint_name = c.r_constraint_name "
+            "and rcc.owner = rc.owner and rcc.constraint_name = rc.constraint_name "
+            "and rcc.position = cc.position", owner)
+        for table_name, column_name, position, constraint_name, delete_rule, \
+                deferrable, deferred, pk_owner, pk_table_name, pk_column_name, \
+                pk_constraint_name in cursor:
+            if table_name not in tables:
+                continue
+            if delete_rule == 'CASCADE':
+                delete_rule = DatabaseMetaData.importedKeyCascade
+            elif delete_rule == 'SET NULL':
+                delete_rule = DatabaseMetaData.importedKeySetNull
+            else:
+                delete_rule = DatabaseMetaData.importedKeyNoAction
+            if deferrable != 'DEFERRABLE':
+                deferrability = DatabaseMetaData.importedKeyNotDeferrable
+            elif deferred == 'DEFERRED':
+                deferrability = DatabaseMetaData.importedKeyInitiallyDeferred
+            else:
+                deferrability = DatabaseMetaData.importedKeyInitiallyImmediate
+            if ora_schema is None and pk_owner == owner:
+                # the default schema's tables are reflected without a
+                # schema, so refer to them without one
+                pk_owner = None
+            row = (None, pk_owner, pk_table_name, pk_column_name,
+                   None, owner, table_name, column_name, position,
+                   DatabaseMetaData.importedKeyNoAction, delete_rule,
+                   constraint_name, pk_constraint_name, deferrability)
+            tables[table_name][2].append(tuple([_plain(value) for value in row]))
+
+        return tables
+
     def get_default_schema_name(self, connection):
         return connection.execute('SELECT USER FROM DUAL').scalar()
     get_default_schema_name = base.connection_memoize(
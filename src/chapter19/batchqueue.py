@@ -0,0 +1,141 @@
+"""A Queue that can also move items in batches."""
+
+from __future__ import with_statement
+from time import time as _time
+from Queue import Queue, Empty, Full
+
+__all__ = ['BatchQueue']
+
+def _notify(condition, n):
+    # Wake up to n waiters; the caller must hold the condition's lock.
+    # Jython's Condition.notify() does not take a count, so loop instead.
+    for i in xrange(n):
+        condition.notify()
+
+def _endtime(block, timeout):
+    # Deadline for a blocking call, or None to wait forever
+    if not block or timeout is None:
+        return None
+    if timeout < 0:
+        raise ValueError("'timeout' must be a positive number")
+    return _time() + timeout
+
+class BatchQueue(Queue):
+    """Variant of Queue with put_many() and get_many().
+
+    Each batch is moved while the mutex is held just once, instead of
+    once per item, and task_done() can complete a whole batch.
+    """
+    def task_done(self, n=1):
+        """Indicate that a formerly enqueued task is complete.
+
+        Used by Queue consumer threads.  For each get() used to fetch a task,
+        a subsequent call to task_done() tells the queue that the processing
+        on the task is complete.  Consumers using get_many() can pass the
+        number of items in the batch as 'n' to complete them all at once.
+
+        If a join() is currently blocking, it will resume when all items
+        have been processed (meaning that a task_done() call was received
+        for every item that had been put() into the queue).
+
+        Raises a ValueError if called more times than there were items
+        placed in the queue.
+        """
+        if n < 0:
+            raise ValueError("'n' must be a non-negative number")
+        with self.all_tasks_done:
+            unfinished = self.unfinished_tasks - n
+            if unfinished <= 0:
+                if unfinished < 0:
+                    raise ValueError('task_done() called too many times')
+                self.all_tasks_done.notifyAll()
+            self.unfinished_tasks = unfinished
+
+    def put_many(self, items, block=True, timeout=None):
+        """Put a batch of items into the queue, in order.
+
+        As many items as there are free slots for are moved while the
+        mutex is held just once, and waiting consumers are woken up once
+        per item added, so an unbounded queue takes the whole batch in a
+        single lock acquisition.
+
+        If 'block' is false, the batch is only enqueued if there are free
+        slots for all of it; otherwise nothing is added and the Full
+        exception is raised.  If 'block' is true, block as in put() until
+        the remainder of the batch fits.  If 'timeout' expires first, Full
+        is raised and the items already enqueued remain in the queue.
+        """
+        items = list(items)
+        with self.not_full:
+            if not block:
+                if self.maxsize > 0 and \
+                        len(items) > self.maxsize - self._qsize():
+                    raise Full
+            elif timeout is not None:
+                if timeout < 0:
+                    raise ValueError("'timeout' must be a positive number")
+                endtime = _time() + timeout
+            i = 0
+            while i < len(items):
+                if block:
+                    while self._full():
+                        if timeout is None:
+                            self.not_full.wait()
+                        else:
+                            remaining = endtime - _time()
+                            if remaining <= 0.0:
+                                raise Full
+                            self.not_full.wait(remaining)
+                # the mutex is held until this slice is added, so no
+                # other producer can take the room counted here
+                start = i
+                if self.maxsize > 0:
+                    stop = min(len(items), i + self.maxsize - self._qsize())
+                else:
+                    stop = len(items)
+                try:
+                    while i < stop:
+                        self._put(items[i])
+                        i += 1
+                finally:
+                    added = i - start
+                    self.unfinished_tasks += added
+                    _notify(self.not_empty, added)
+
+    def get_many(self, max_items=None, block=True, timeout=None):
+        """Remove and return a list of up to 'max_items' items.
+
+        Blocks as get() does until at least one item is available, then
+        drains up to 'max_items' items (all of them if 'max_items' is
+        None) while holding the mutex just once.  Waiting producers are
+        woken up once per item removed.
+
+        Each item returned still counts as an unfinished task; call
+        task_done(len(items)) when the batch has been processed.
+        """
+        if max_items is not None and max_items < 1:
+            raise ValueError("'max_items' must be a positive number")
+        with self.not_empty:
+            if not block:
+                if self._empty():
+                    raise Empty
+            elif timeout is None:
+                while self._empty():
+                    self.not_empty.wait()
+            else:
+                if timeout < 0:
+                    raise ValueError("'timeout' must be a positive number")
+                endtime = _time() + timeout
+                while self._empty():
+                    remaining = endtime - _time()
+                    if remaining <= 0.0:
+                        raise Empty
+                    self.not_empty.wait(remaining)
+            items = []
+            try:
+                while not self._empty() and \
+                        (max_items is None or len(items) < max_items):
+                    items.append(self._get())
+            finally:
+                _notify(self.not_full, len(items))
+            return items
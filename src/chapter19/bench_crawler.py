@@ -0,0 +1,153 @@
+# Crawler throughput benchmarks against a local stand-in web server.
+#
+# The download examples fetch live sites, so how fast they run says more
+# about the network than about the code.  Here a LocalServer plays the
+# web, with PROFILES of body size, latency and error rate, and
+# Fetchers are driven the ways the examples use them: all at once
+# through invokeAll (fetch_futures.py), as they finish through an
+# ExecutorCompletionService (crawl_completion.py), and on an event loop
+# (eventloop.DownloadLoop) for comparison.
+#
+# crawl() measures one configuration; suite() runs a grid of them,
+# printing pages/sec, bytes/sec and download latency percentiles, and
+# can write the results as CSV so runs can be compared.
+from bench_queue import percentile
+from connpool import ConnectionPool
+from fetcher import Fetcher
+from eventloop import DownloadLoop
+from localserver import start_server
+from shutdown import shutdown_and_await_termination
+from java.util.concurrent import Executors, ExecutorCompletionService
+import csv
+import sys
+import time
+
+# name -> (body size, mean latency in seconds, error rate)
+PROFILES = {
+    'fast': (4 * 1024, 0.0, 0.0),
+    'slow': (4 * 1024, 0.02, 0.0),
+    'large': (256 * 1024, 0.0, 0.0),
+    'flaky': (4 * 1024, 0.005, 0.05),
+}
+MODES = ('invokeAll', 'completion', 'eventloop')
+THREADS = (1, 4, 16, 64)
+
+FIELDS = ['profile', 'mode', 'threads', 'pages', 'errors', 'seconds',
+          'pages_per_sec', 'bytes_per_sec', 'p50_latency', 'p90_latency',
+          'p99_latency']
+
+def invoke_all(downloaders, threads):
+    pool = Executors.newFixedThreadPool(threads)
+    for future in pool.invokeAll(downloaders):
+        future.get()
+    shutdown_and_await_termination(pool, 5)
+
+def completion(downloaders, threads):
+    pool = Executors.newFixedThreadPool(threads)
+    ecs = ExecutorCompletionService(pool)
+    for downloader in downloaders:
+        ecs.submit(downloader)
+    for i in xrange(len(downloaders)):
+        ecs.take().get()
+    shutdown_and_await_termination(pool, 5)
+
+def event_loop(downloaders, threads):
+    DownloadLoop(threads=threads).run(downloaders)
+
+RUNNERS = {'invokeAll': invoke_all, 'completion': completion,
+           'eventloop': event_loop}
+
+def crawl(server, mode, threads, pages=500, retries=0):
+    """Download 'pages' pages from 'server' with 'threads' threads the
+    way 'mode' does, and return a dict of results (see FIELDS).
+
+    Latencies are in seconds, from a Fetcher starting to it
+    completing.  Every page is on the same host, so each run gets a
+    connection pool with a connection per thread; the shared pool's
+    per-host limit would otherwise cap the concurrency being measured.
+    """
+    pool = ConnectionPool(max_per_host=threads)
+    downloaders = [Fetcher(server.url('/page/%d' % i), pool=pool,
+                           retries=retries)
+                   for i in xrange(pages)]
+    start = time.time()
+    RUNNERS[mode](downloaders, threads)
+    elapsed = time.time() - start
+    pool.close()
+    latencies = sorted([d.completed - d.started for d in downloaders])
+    errors = len([d for d in downloaders if d.exception])
+    return {
+        'mode': mode,
+        'threads': threads,
+        'pages': pages,
+        'errors': errors,
+        'seconds': elapsed,
+        'pages_per_sec': (pages - errors) / elapsed,
+        'bytes_per_sec': sum([d.bytes_read for d in downloaders]) / elapsed,
+        'p50_latency': percentile(latencies, 50),
+        'p90_latency': percentile(latencies, 90),
+        'p99_latency': percentile(latencies, 99),
+    }
+
+def suite(profiles=None, modes=MODES, threads=THREADS, pages=500, retries=0,
+          output=None):
+    """Run crawl() for every combination of the given settings, each
+    profile against its own LocalServer.
+
+    Results are printed and, if 'output' is given, written to that file
+    as CSV with the FIELDS columns.
+    """
+    results = []
+    print "%-6s %-10s %4s %6s %9s %10s %8s %8s %8s" % (
+        "prof", "mode", "T", "errors", "pages/s", "KB/s",
+        "p50 ms", "p90 ms", "p99 ms")
+    for name in profiles or sorted(PROFILES):
+        body_size, latency, error_rate = PROFILES[name]
+        server = start_server(body_size=body_size, latency=latency,
+                              error_rate=error_rate)
+        try:
+            for mode in modes:
+                for n in threads:
+                    r = crawl(server, mode, n, pages, retries)
+                    r['profile'] = name
+                    results.append(r)
+                    print "%-6s %-10s %4d %6d %9.0f %10.0f %8.1f %8.1f %8.1f" % (
+                        name, mode, n, r['errors'], r['pages_per_sec'],
+                        r['bytes_per_sec'] / 1024, r['p50_latency'] * 1e3,
+                        r['p90_latency'] * 1e3, r['p99_latency'] * 1e3)
+        finally:
+            server.stop()
+    if output is not None:
+        f = open(output, 'wb')
+        try:
+            writer = csv.DictWriter(f, FIELDS)
+            writer.writerow(dict(zip(FIELDS, FIELDS)))
+            writer.writerows(results)
+        finally:
+            f.close()
+    return results
+
+def main(args):
+    from optparse import OptionParser
+    parser = OptionParser(usage='%prog [options]')
+    parser.add_option('-o', '--output', dest='output', default=None,
+                      help='write the results to this CSV file')
+    parser.add_option('-n', '--pages', dest='pages', type='int', default=500,
+                      help='pages to download per run')
+    parser.add_option('-p', '--profile', dest='profiles', action='append',
+                      choices=sorted(PROFILES),
+                      help='server profile to run (repeatable; default all)')
+    parser.add_option('-m', '--mode', dest='modes', action='append',
+                      choices=MODES,
+                      help='how to drive the downloads (repeatable; default all)')
+    parser.add_option('-t', '--threads', dest='threads', action='append',
+                      type='int',
+                      help='thread count to run with (repeatable)')
+    parser.add_option('-r', '--retries', dest='retries', type='int', default=0,
+                      help='retries per page for transient errors')
+    options, args = parser.parse_args(args)
+    suite(options.profiles, options.modes or MODES, options.threads or THREADS,
+          options.pages, options.retries, options.output)
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,53 @@
+# Compare Fetcher's pooled keep-alive connections with opening a new
+# connection per URL through urllib2, against a local server so that
+# connection setup, not the network, dominates.
+from fetcher import Fetcher, shared_pool
+from localserver import start_server
+from shutdown import shutdown_and_await_termination
+from java.util.concurrent import Executors
+import sys
+import time
+import urllib2
+
+class UrllibDownloader(Fetcher):
+    # the original implementation: a fresh connection for every URL,
+    # with no validators to cache
+    def fetch(self):
+        return urllib2.urlopen(self.url).read(), (None, None)
+
+def run(downloader_class, urls, threads):
+    pool = Executors.newFixedThreadPool(threads)
+    downloaders = [downloader_class(url) for url in urls]
+    start = time.time()
+    for future in pool.invokeAll(downloaders):
+        future.get()
+    elapsed = time.time() - start
+    shutdown_and_await_termination(pool, 5)
+    errors = [d for d in downloaders if d.exception]
+    if errors:
+        # a rate for failed downloads would be meaningless
+        raise RuntimeError("%s: %d errors, first: %s" % (
+            downloader_class.__name__, len(errors), errors[0]))
+    return len(urls) / elapsed
+
+def bench(num_urls=2000, threads=(1, 4, 16), body_size=4096):
+    server = start_server(body_size=body_size)
+    try:
+        urls = [server.url('/page/%d' % i) for i in xrange(num_urls)]
+        print "%8s %14s %14s %12s" % ("threads", "urllib2 pg/s", "pooled pg/s",
+                                      "connections")
+        for n in threads:
+            urllib_rate = run(UrllibDownloader, urls, n)
+            before = server.connections
+            pooled_rate = run(Fetcher, urls, n)
+            print "%8d %14.0f %14.0f %12d" % (
+                n, urllib_rate, pooled_rate, server.connections - before)
+    finally:
+        shared_pool.close()
+        server.stop()
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1:
+        bench(int(sys.argv[1]))
+    else:
+        bench()
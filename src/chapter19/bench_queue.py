@@ -0,0 +1,165 @@
+# Queue benchmarks.
+#
+# bench() compares the deque-backed Queue with the preallocated
+# RingQueue at bounded capacities from 16 up to 1M slots.  Each run
+# repeatedly fills the queue to capacity and drains it again, which is
+# the steady state of a fixed-size pipeline stage.
+#
+# handoff() runs N producer threads against M consumer threads on any
+# Queue class and measures throughput and put-to-get latency;
+# handoff_suite() runs it over a grid of configurations and can write
+# the results as CSV, so runs can be compared to catch regressions.
+from __future__ import with_statement
+from Queue import Queue
+from ringqueue import RingQueue
+import csv
+import sys
+import threading
+import time
+
+CAPACITIES = [16, 256, 4096, 65536, 1048576]
+OPS = 2 ** 21   # puts (and gets) per measurement
+
+def fill_and_drain(q, capacity, ops):
+    put, get = q.put, q.get
+    rounds = max(1, ops // capacity)
+    start = time.time()
+    for r in xrange(rounds):
+        for i in xrange(capacity):
+            put(i)
+        for i in xrange(capacity):
+            get()
+    elapsed = time.time() - start
+    return rounds * capacity / elapsed
+
+def bench(capacities=CAPACITIES, ops=OPS):
+    print "%10s %14s %14s %8s" % ("capacity", "deque ops/s", "ring ops/s", "ratio")
+    for capacity in capacities:
+        deque_rate = fill_and_drain(Queue(capacity), capacity, ops)
+        ring_rate = fill_and_drain(RingQueue(capacity), capacity, ops)
+        print "%10d %14.0f %14.0f %8.2f" % (
+            capacity, deque_rate, ring_rate, ring_rate / deque_rate)
+
+HANDOFF_FIELDS = ['queue', 'producers', 'consumers', 'item_size', 'maxsize',
+                  'items', 'seconds', 'ops_per_sec', 'p50_latency', 'p99_latency']
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return None
+    index = int(round(p / 100.0 * (len(sorted_values) - 1)))
+    return sorted_values[index]
+
+def _micros(seconds):
+    # Format a latency for the handoff table; None when nothing was timed
+    if seconds is None:
+        return '-'
+    return '%.1f' % (seconds * 1e6)
+
+def handoff(queue_class, producers=1, consumers=1, item_size=16, maxsize=0,
+            items=100000):
+    """Move 'items' items from producer to consumer threads through a
+    queue_class(maxsize) and return a dict of results (see HANDOFF_FIELDS).
+
+    Latencies are in seconds, from just before put() to just after get().
+    Each item carries a new 'item_size' byte string, built before its
+    put() is timed, so the cost of allocating and collecting items of
+    that size is part of the measurement.
+    """
+    q = queue_class(maxsize)
+    per_producer = items // producers
+    latencies = []
+    latencies_lock = threading.Lock()
+
+    def produce():
+        put, now = q.put, time.time
+        for i in xrange(per_producer):
+            payload = 'x' * item_size
+            put((now(), payload))
+
+    def consume():
+        get, task_done, now = q.get, q.task_done, time.time
+        mine = []
+        while True:
+            item = get()
+            if item is None:
+                task_done()
+                break
+            mine.append(now() - item[0])
+            task_done()
+        with latencies_lock:
+            latencies.extend(mine)
+
+    consumer_threads = [threading.Thread(target=consume)
+                        for i in xrange(consumers)]
+    producer_threads = [threading.Thread(target=produce)
+                        for i in xrange(producers)]
+    start = time.time()
+    for t in consumer_threads + producer_threads:
+        t.start()
+    for t in producer_threads:
+        t.join()
+    # wait until every item has been consumed before sending the
+    # sentinels, so they can't overtake items in a LIFO or priority queue
+    q.join()
+    elapsed = time.time() - start
+    for i in xrange(consumers):
+        q.put(None)
+    for t in consumer_threads:
+        t.join()
+    latencies.sort()
+    moved = per_producer * producers
+    return {
+        'queue': queue_class.__name__,
+        'producers': producers,
+        'consumers': consumers,
+        'item_size': item_size,
+        'maxsize': maxsize,
+        'items': moved,
+        'seconds': elapsed,
+        'ops_per_sec': elapsed and moved / elapsed,
+        'p50_latency': percentile(latencies, 50),
+        'p99_latency': percentile(latencies, 99),
+    }
+
+def handoff_suite(queue_classes, producers=(1, 4), consumers=(1, 4),
+                  item_sizes=(16, 4096), maxsizes=(0, 16, 1024),
+                  items=100000, output=None):
+    """Run handoff() for every combination of the given settings.
+
+    Queue classes that reject a maxsize (RingQueue needs one > 0) are
+    skipped for it.  Results are printed and, if 'output' is given,
+    written to that file as CSV with the HANDOFF_FIELDS columns.
+    """
+    results = []
+    print "%-14s %3s %3s %6s %7s %12s %10s %10s" % (
+        "queue", "P", "C", "size", "maxsize", "ops/s", "p50 us", "p99 us")
+    for queue_class in queue_classes:
+        for maxsize in maxsizes:
+            try:
+                queue_class(maxsize)
+            except ValueError:
+                continue
+            for item_size in item_sizes:
+                for p in producers:
+                    for c in consumers:
+                        r = handoff(queue_class, p, c, item_size, maxsize, items)
+                        results.append(r)
+                        print "%-14s %3d %3d %6d %7d %12.0f %10s %10s" % (
+                            r['queue'], p, c, item_size, maxsize,
+                            r['ops_per_sec'], _micros(r['p50_latency']),
+                            _micros(r['p99_latency']))
+    if output is not None:
+        f = open(output, 'wb')
+        try:
+            writer = csv.DictWriter(f, HANDOFF_FIELDS)
+            writer.writerow(dict(zip(HANDOFF_FIELDS, HANDOFF_FIELDS)))
+            writer.writerows(results)
+        finally:
+            f.close()
+    return results
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1:
+        bench(ops=int(sys.argv[1]))
+    else:
+        bench()
@@ -0,0 +1,176 @@
+"""Per-host pools of persistent (keep-alive) HTTP connections."""
+
+from __future__ import with_statement
+import httplib
+import socket
+import threading
+import time
+import urllib2
+import urlparse
+
+__all__ = ['ConnectionPool']
+
+_REDIRECTS = (301, 302, 303, 307)
+
+class _HostPool(object):
+    # The connections to one (scheme, host:port).  'slots' limits how
+    # many may exist at once, idle or in use.
+    def __init__(self, max_connections, idle_timeout):
+        self.slots = threading.Semaphore(max_connections)
+        self.idle_timeout = idle_timeout
+        self.idle = []      # (connection, time released), oldest first
+        self.lock = threading.Lock()
+
+    def acquire(self, connect):
+        """Return (connection, reused), waiting for a free slot."""
+        self.slots.acquire()
+        now = time.time()
+        with self.lock:
+            expired = []
+            while self.idle and now - self.idle[0][1] > self.idle_timeout:
+                expired.append(self.idle.pop(0)[0])
+            conn = None
+            if self.idle:
+                conn = self.idle.pop()[0]
+        for old in expired:
+            old.close()
+        if conn is not None:
+            return conn, True
+        try:
+            return connect(), False
+        except:
+            self.slots.release()
+            raise
+
+    def release(self, conn, reusable):
+        if reusable:
+            with self.lock:
+                self.idle.append((conn, time.time()))
+        else:
+            conn.close()
+        self.slots.release()
+
+class _PooledResponse(object):
+    """An httplib response whose connection goes back to its pool when
+    the response is closed.
+
+    Only a connection whose response body was read completely, and
+    which the server did not ask to close, is reused.
+    """
+    def __init__(self, url, response, conn, host):
+        self.url = url
+        self.status = response.status
+        self.reason = response.reason
+        self.msg = response.msg
+        self._response = response
+        self._conn = conn
+        self._host = host
+
+    def getheader(self, name, default=None):
+        return self._response.getheader(name, default)
+
+    def read(self, amt=None):
+        return self._response.read(amt)
+
+    def close(self):
+        if self._host is None:
+            return
+        reusable = self._response.isclosed() and not self._response.will_close
+        self._response.close()
+        self._host.release(self._conn, reusable)
+        self._host = None
+
+class ConnectionPool(object):
+    """Thread-safe pools of HTTP/1.1 connections, one pool per host.
+
+    At most 'max_per_host' connections to a host exist at once; a thread
+    that needs another one waits until a connection is released.  Idle
+    connections are closed once they have been unused for 'idle_timeout'
+    seconds.  'timeout' is the socket timeout for new connections.
+    """
+    def __init__(self, max_per_host=4, idle_timeout=30.0, timeout=None,
+                 max_redirects=5):
+        self.max_per_host = max_per_host
+        self.idle_timeout = idle_timeout
+        self.timeout = timeout
+        self.max_redirects = max_redirects
+        self._hosts = {}
+        self._lock = threading.Lock()
+
+    def urlopen(self, url, headers=None):
+        """GET 'url' and return its response, following redirects.
+
+        Like urllib2.urlopen, raises urllib2.HTTPError for status codes
+        of 400 and up.  The response must be closed to give its
+        connection back to the pool.
+        """
+        for i in xrange(self.max_redirects + 1):
+            response = self._get(url, headers or {})
+            location = response.getheader('location')
+            if response.status not in _REDIRECTS or not location:
+                break
+            response.read()
+            response.close()
+            url = urlparse.urljoin(url, location)
+        else:
+            raise urllib2.HTTPError(url, response.status, 'too many redirects',
+                                    response.msg, None)
+        if response.status >= 400:
+            response.close()
+            raise urllib2.HTTPError(url, response.status, response.reason,
+                                    response.msg, None)
+        return response
+
+    def close(self):
+        """Close all idle connections."""
+        with self._lock:
+            hosts = self._hosts.values()
+        for host in hosts:
+            with host.lock:
+                idle, host.idle = host.idle, []
+            for conn, released in idle:
+                conn.close()
+
+    def _get(self, url, headers):
+        scheme, netloc, path, query, fragment = urlparse.urlsplit(url)
+        if scheme not in ('http', 'https'):
+            raise ValueError("unsupported URL scheme '%s'" % scheme)
+        selector = path or '/'
+        if query:
+            selector += '?' + query
+        host = self._host(scheme, netloc)
+        def connect():
+            if scheme == 'https':
+                conn = httplib.HTTPSConnection(netloc)
+            else:
+                conn = httplib.HTTPConnection(netloc)
+            if self.timeout is not None:
+                conn.connect()
+                conn.sock.settimeout(self.timeout)
+            return conn
+        while True:
+            conn, reused = host.acquire(connect)
+            try:
+                conn.request('GET', selector, headers=headers)
+                response = conn.getresponse()
+            except (httplib.HTTPException, socket.error):
+                host.release(conn, False)
+                if reused:
+                    # the server may have closed an idle connection;
+                    # try again with another one
+                    continue
+                raise
+            except:
+                host.release(conn, False)
+                raise
+            return _PooledResponse(url, response, conn, host)
+
+    def _host(self, scheme, netloc):
+        key = (scheme, netloc.lower())
+        with self._lock:
+            try:
+                return self._hosts[key]
+            except KeyError:
+                host = self._hosts[key] = _HostPool(self.max_per_host,
+                                                    self.idle_timeout)
+                return host
@@ -0,0 +1,51 @@
+from fetcher import Fetcher
+from frontier import Frontier
+from httpcache import HTTPCache
+from politeness import HostScheduler
+from spider import crawl, same_hosts
+from shutdown import shutdown_and_await_termination
+from java.util.concurrent import Executors, ExecutorCompletionService
+import os
+import hashlib
+import tempfile
+
+MAX_CONCURRENT = 3
+MAX_PER_HOST = 2     # concurrent downloads from any one host
+REQUESTS_PER_SECOND = 1.0  # per host
+MAX_PAGES = 50
+SITES = [
+    "http://www.cnn.com/",
+    "http://www.nytimes.com/",
+    "http://www.washingtonpost.com/",
+    "http://www.dailycamera.com/",
+    "http://www.timescall.com/",
+    # generate a random web site name that is very, very unlikely to exist
+    "http://" + hashlib.md5(
+        "unlikely-web-site-" + os.urandom(4)).hexdigest() + ".com",
+    ]
+
+# keep the pages between runs, so unchanged ones aren't downloaded again
+cache = HTTPCache(os.path.join(tempfile.gettempdir(), "chapter19-cache"))
+
+pool = Executors.newFixedThreadPool(MAX_CONCURRENT)
+ecs = ExecutorCompletionService(pool)
+# hold back downloads from busy hosts, without tying up pool threads
+hosts = HostScheduler(ecs, max_per_host=MAX_PER_HOST, rate=REQUESTS_PER_SECOND)
+
+# the URLs seen so far, so each page is only downloaded once
+frontier = Frontier(tempfile.mkdtemp(prefix="chapter19-frontier-"))
+
+# spider the links from these roots, staying on the same sites, and
+# work with results as soon as they become available
+for result in crawl(SITES, ecs, frontier,
+                    lambda url: Fetcher(url, cache=cache),
+                    submit=hosts.submit, follow=same_hosts(SITES),
+                    max_pages=MAX_PAGES):
+    # here we just do something unimaginative with the result;
+    # consider parsing it with tools like beautiful soup
+    print result
+
+print "shutting pool down..."
+hosts.shutdown()
+shutdown_and_await_termination(pool, 5)
+print "done"
@@ -0,0 +1,408 @@
+"""Download many URLs at once on a few threads, with non-blocking
+sockets and a poll loop instead of a pool thread per download.
+
+A Downloader run by an executor holds its thread for the whole network
+wait, so a pool of N threads has at most N requests in flight.  Here
+each thread multiplexes up to thousands of connections:
+
+    downloaders = [Downloader(url) for url in urls]
+    for downloader in DownloadLoop(threads=2).run(downloaders):
+        print downloader
+
+On Jython, select.poll is built on a java.nio Selector.
+"""
+
+from collections import deque
+import errno
+import os
+import select
+import socket
+import threading
+import time
+import urllib2
+import urlparse
+
+__all__ = ['DownloadLoop']
+
+_REDIRECTS = (301, 302, 303, 307)
+_READ_SIZE = 64 * 1024
+_IN_PROGRESS = (errno.EINPROGRESS, errno.EALREADY, errno.EWOULDBLOCK)
+_CONNECTED = (0, errno.EISCONN)
+
+class DownloadLoop(object):
+    """Fetch Downloaders' URLs with HTTP/1.1 GETs on non-blocking sockets.
+
+    run() fills in the same attributes as Fetcher.call() - result,
+    bytes_read, started, completed, thread_used and exception - so the
+    results can be used just like those from an executor.  The work is
+    split over 'threads' event loops, with at most 'max_in_flight'
+    requests open at once.  A request that sees no activity for
+    'timeout' seconds fails with socket.timeout.
+
+    Connections are kept alive and reused for later URLs on the same
+    host.  Only http URLs are supported, and a downloader's sink and
+    cache are not used.  Host names are resolved (blocking) once per
+    loop.
+    """
+    def __init__(self, threads=1, max_in_flight=1000, timeout=30.0,
+                 max_redirects=5):
+        self.threads = threads
+        self.max_in_flight = max_in_flight
+        self.timeout = timeout
+        self.max_redirects = max_redirects
+
+    def run(self, downloaders):
+        """Download every one of 'downloaders' and return them."""
+        downloaders = list(downloaders)
+        threads = max(1, min(self.threads, len(downloaders)))
+        if threads == 1:
+            _Loop(self, downloaders, self.max_in_flight).run()
+            return downloaders
+        max_in_flight = max(1, self.max_in_flight // threads)
+        workers = [threading.Thread(
+            target=_Loop(self, downloaders[i::threads], max_in_flight).run,
+            name='DownloadLoop-%d' % i) for i in xrange(threads)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        return downloaders
+
+class _Response(object):
+    # An incrementally parsed HTTP/1.1 response.  feed() returns True
+    # once the whole response has arrived.
+    def __init__(self):
+        self.status = None
+        self.reason = None
+        self.headers = {}
+        self.body = []
+        self.will_close = False
+        self.received = 0
+        self._buf = ''
+        self._remaining = None # body or chunk bytes left; None reads to EOF
+        self._state = 'headers'
+
+    def feed(self, data):
+        self.received += len(data)
+        self._buf += data
+        while True:
+            state = self._state
+            if state == 'headers':
+                end = self._buf.find('\r\n\r\n')
+                if end < 0:
+                    return False
+                self._parse_headers(self._buf[:end])
+                self._buf = self._buf[end + 4:]
+            elif state in ('body', 'chunk'):
+                if self._remaining is None:
+                    self.body.append(self._buf)
+                    self._buf = ''
+                    return False
+                data = self._buf[:self._remaining]
+                self.body.append(data)
+                self._remaining -= len(data)
+                self._buf = self._buf[len(data):]
+                if self._remaining:
+                    return False
+                if state == 'body':
+                    self._state = 'done'
+                else:
+                    self._state = 'chunk-end'
+            elif state == 'chunk-end':
+                if len(self._buf) < 2:
+                    return False
+                self._buf = self._buf[2:]
+                self._state = 'chunk-size'
+            elif state in ('chunk-size', 'trailer'):
+                end = self._buf.find('\r\n')
+                if end < 0:
+                    return False
+                line = self._buf[:end]
+                self._buf = self._buf[end + 2:]
+                if state == 'trailer':
+                    if not line:
+                        self._state = 'done'
+                else:
+                    self._remaining = int(line.split(';')[0].strip(), 16)
+                    if self._remaining:
+                        self._state = 'chunk'
+                    else:
+                        self._state = 'trailer'
+            if self._state == 'done':
+                return True
+
+    def eof(self):
+        """Return True if the connection closing completes the response."""
+        return self._state == 'body' and self._remaining is None
+
+    def _parse_headers(self, text):
+        lines = text.split('\r\n')
+        parts = lines[0].split(None, 2)
+        if len(parts) < 2 or not parts[0].startswith('HTTP/'):
+            raise ValueError('bad status line %r' % lines[0])
+        version = parts[0]
+        self.status = int(parts[1])
+        self.reason = len(parts) > 2 and parts[2] or ''
+        for line in lines[1:]:
+            if ':' in line:
+                name, value = line.split(':', 1)
+                self.headers[name.strip().lower()] = value.strip()
+        connection = self.headers.get('connection', '').lower()
+        self.will_close = connection == 'close' or (
+            version == 'HTTP/1.0' and connection != 'keep-alive')
+        if self.status in (204, 304) or 100 <= self.status < 200:
+            self._state = 'done'
+        elif self.headers.get('transfer-encoding', '').lower() == 'chunked':
+            self._state = 'chunk-size'
+        elif 'content-length' in self.headers:
+            self._remaining = int(self.headers['content-length'])
+            self._state = self._remaining and 'body' or 'done'
+        else:
+            self.will_close = True
+            self._state = 'body'
+
+class _Connection(object):
+    def __init__(self, key, address):
+        self.key = key
+        self.address = address
+        self.connected = False
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.sock.setblocking(0)
+        try:
+            self._check(self.sock.connect_ex(address))
+        except:
+            self.sock.close()
+            raise
+
+    def finish_connect(self):
+        # called when the socket becomes writable; returns True once
+        # the connection is established
+        self.connected = self._check(self.sock.connect_ex(self.address))
+        return self.connected
+
+    def close(self):
+        self.sock.close()
+
+    def _check(self, err):
+        if err in _CONNECTED:
+            return True
+        if err in _IN_PROGRESS:
+            return False
+        raise socket.error(err, os.strerror(err))
+
+class _Request(object):
+    def __init__(self, downloader):
+        self.downloader = downloader
+        self.url = downloader.url
+        self.redirects = 0
+        self.conn = None
+        self.reused = False
+        self.out = ''
+        self.response = None
+        self.last_activity = None
+
+class _Poller(object):
+    # select.poll where it exists, select.select otherwise.  Sockets are
+    # identified by fileno(), which on Jython is the socket itself.
+    def __init__(self):
+        self._writers = set()
+        self._readers = set()
+        if hasattr(select, 'poll'):
+            self._poll = select.poll()
+        else:
+            self._poll = None
+
+    def register(self, sock, writable):
+        fd = sock.fileno()
+        self.unregister(sock)
+        if writable:
+            self._writers.add(fd)
+        else:
+            self._readers.add(fd)
+        if self._poll is not None:
+            if writable:
+                mask = select.POLLOUT
+            else:
+                mask = select.POLLIN
+            self._poll.register(sock, mask)
+
+    def unregister(self, sock):
+        fd = sock.fileno()
+        if fd in self._writers or fd in self._readers:
+            self._writers.discard(fd)
+            self._readers.discard(fd)
+            if self._poll is not None:
+                self._poll.unregister(sock)
+
+    def poll(self, timeout):
+        """Return the ready fds, as (fd, writable) pairs."""
+        if self._poll is not None:
+            return [(fd, fd in self._writers)
+                    for fd, event in self._poll.poll(int(timeout * 1000))]
+        if not (self._readers or self._writers):
+            time.sleep(timeout)
+            return []
+        readable, writable, error = select.select(
+            list(self._readers), list(self._writers), list(self._writers),
+            timeout)
+        ready = [(fd, False) for fd in readable]
+        ready.extend([(fd, True) for fd in set(writable + error)])
+        return ready
+
+class _Loop(object):
+    # One thread's share of the downloads
+    def __init__(self, engine, downloaders, max_in_flight):
+        self.engine = engine
+        self.pending = deque(downloaders)
+        self.max_in_flight = max_in_flight
+        self.active = {}    # fd -> _Request
+        self.idle = {}      # (host, port) -> [_Connection]
+        self.addresses = {} # (host, port) -> socket address
+        self.poller = _Poller()
+
+    def run(self):
+        name = threading.currentThread().getName()
+        try:
+            while self.pending or self.active:
+                while self.pending and len(self.active) < self.max_in_flight:
+                    downloader = self.pending.popleft()
+                    downloader.thread_used = name
+                    downloader.started = time.time()
+                    self._start(_Request(downloader))
+                ready = [(self.active.get(fd), writable)
+                         for fd, writable in self.poller.poll(0.1)]
+                for request, writable in [(r, w) for r, w in ready if r]:
+                    # skip events for a connection closed since the poll
+                    if request.conn is None or self.active.get(
+                            request.conn.sock.fileno()) is not request:
+                        continue
+                    try:
+                        if writable:
+                            self._write(request)
+                        else:
+                            self._read(request)
+                    except Exception, ex:
+                        self._fail(request, ex)
+                self._expire()
+        finally:
+            for conns in self.idle.values():
+                for conn in conns:
+                    conn.close()
+
+    def _start(self, request):
+        try:
+            scheme, netloc, path, query, fragment = urlparse.urlsplit(request.url)
+            if scheme != 'http':
+                raise ValueError("unsupported URL scheme '%s'" % scheme)
+            host, port = urllib2.splitport(netloc)
+            port = int(port or 80)
+            key = (host.lower(), port)
+            selector = path or '/'
+            if query:
+                selector += '?' + query
+            request.out = ('GET %s HTTP/1.1\r\nHost: %s\r\n'
+                           'Accept-Encoding: identity\r\n\r\n' % (selector, netloc))
+            request.response = _Response()
+            idle = self.idle.get(key)
+            if idle:
+                request.conn, request.reused = idle.pop(), True
+            else:
+                address = self.addresses.get(key)
+                if address is None:
+                    address = self.addresses[key] = socket.getaddrinfo(
+                        host, port, socket.AF_INET, socket.SOCK_STREAM)[0][4]
+                request.conn, request.reused = _Connection(key, address), False
+        except Exception, ex:
+            self._finish(request, ex)
+            return
+        request.last_activity = time.time()
+        self.active[request.conn.sock.fileno()] = request
+        self.poller.register(request.conn.sock, True)
+
+    def _write(self, request):
+        conn = request.conn
+        if not conn.connected and not conn.finish_connect():
+            return
+        try:
+            sent = conn.sock.send(request.out)
+        except socket.error, ex:
+            if ex[0] in _IN_PROGRESS:
+                return
+            raise
+        request.last_activity = time.time()
+        request.out = request.out[sent:]
+        if not request.out:
+            self.poller.register(conn.sock, False)
+
+    def _read(self, request):
+        try:
+            data = request.conn.sock.recv(_READ_SIZE)
+        except socket.error, ex:
+            if ex[0] in _IN_PROGRESS:
+                return
+            if request.reused and not request.response.received:
+                return self._retry(request)
+            raise
+        request.last_activity = time.time()
+        response = request.response
+        if data:
+            if response.feed(data):
+                self._complete(request, not response.will_close)
+        elif response.eof():
+            self._complete(request, False)
+        elif request.reused and not response.received:
+            self._retry(request)
+        else:
+            raise socket.error(errno.ECONNRESET, 'connection closed early')
+
+    def _retry(self, request):
+        # the server closed a kept-alive connection while it was idle
+        self._release(request, False)
+        self._start(request)
+
+    def _complete(self, request, reusable):
+        response = request.response
+        self._release(request, reusable)
+        location = response.headers.get('location')
+        if response.status in _REDIRECTS and location:
+            if request.redirects >= self.engine.max_redirects:
+                return self._finish(request, urllib2.HTTPError(
+                    request.url, response.status, 'too many redirects',
+                    response.headers, None))
+            request.redirects += 1
+            request.url = urlparse.urljoin(request.url, location)
+            return self._start(request)
+        if response.status >= 400:
+            return self._finish(request, urllib2.HTTPError(
+                request.url, response.status, response.reason,
+                response.headers, None))
+        body = ''.join(response.body)
+        request.downloader.result = body
+        request.downloader.bytes_read = len(body)
+        self._finish(request)
+
+    def _fail(self, request, ex):
+        if request.conn is not None:
+            self._release(request, False)
+        self._finish(request, ex)
+
+    def _release(self, request, reusable):
+        conn = request.conn
+        request.conn = None
+        fd = conn.sock.fileno()
+        self.poller.unregister(conn.sock)
+        del self.active[fd]
+        if reusable:
+            self.idle.setdefault(conn.key, []).append(conn)
+        else:
+            conn.close()
+
+    def _finish(self, request, exception=None):
+        request.downloader.exception = exception
+        request.downloader.completed = time.time()
+
+    def _expire(self):
+        deadline = time.time() - self.engine.timeout
+        for request in self.active.values():
+            if request.last_activity < deadline:
+                self._fail(request, socket.timeout('timed out'))
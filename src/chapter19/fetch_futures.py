@@ -0,0 +1,40 @@
+from fetcher import Fetcher
+from eventloop import DownloadLoop
+from httpcache import HTTPCache
+from retry import Hedge
+from shutdown import shutdown_and_await_termination
+from java.util.concurrent import Executors, TimeUnit
+import os
+import sys
+import tempfile
+
+MAX_CONCURRENT = 3
+SITES = [
+    "http://www.cnn.com/",
+    "http://www.nytimes.com/",
+    "http://www.washingtonpost.com/",
+    "http://www.dailycamera.com/",
+    "http://www.timescall.com/",
+    ]
+
+# keep the pages between runs, so unchanged ones aren't downloaded again
+cache = HTTPCache(os.path.join(tempfile.gettempdir(), "chapter19-cache"))
+
+if "--event-loop" in sys.argv:
+    # every download in flight at once on a single thread, rather than
+    # one pool thread each (the event loop doesn't use the cache)
+    for downloader in DownloadLoop().run(Fetcher(url) for url in SITES):
+        print downloader
+else:
+    pool = Executors.newFixedThreadPool(MAX_CONCURRENT)
+    # retry transient failures, and duplicate any request slower than
+    # 90% of the others so one slow site doesn't hold up the batch
+    hedge = Hedge(percentile=90, min_samples=3)
+    downloaders = [Fetcher(url, cache=cache, retries=2, hedge=hedge)
+                   for url in SITES]
+    futures = pool.invokeAll(downloaders)
+
+    for future in futures:
+        print future.get(5, TimeUnit.SECONDS)
+
+    shutdown_and_await_termination(pool, 5)
@@ -0,0 +1,155 @@
+"""A Downloader that reuses kept-alive connections, and can stream,
+cache, retry and hedge its downloads."""
+
+import threading
+import time
+from connpool import ConnectionPool
+from downloader import Downloader
+import retry
+
+__all__ = ['Fetcher', 'shared_pool']
+
+# shared by every Fetcher that isn't given its own pool, so
+# connections are kept alive and reused across the executor's threads
+shared_pool = ConnectionPool(max_per_host=4, idle_timeout=30.0)
+
+def _validators(response):
+    return response.getheader('etag'), response.getheader('last-modified')
+
+class Fetcher(Downloader):
+    # A Downloader that fetches over kept-alive connections from a
+    # connpool.ConnectionPool.
+    # If sink is given - a filename or anything with a write method - the
+    # body is streamed to it chunk_size bytes at a time instead of being
+    # kept in result, so memory use doesn't depend on the document size.
+    # If cache (an httpcache.HTTPCache) is given, fetches are conditional
+    # GETs and unchanged bodies come from the cache; streaming skips it.
+    # Transient errors are retried up to 'retries' times after a jittered
+    # exponential backoff (see retry.backoff); a stream is only retried if
+    # nothing was written yet.  If hedge (a retry.Hedge shared by the
+    # batch) is given, a fetch that is slower than most is duplicated and
+    # the first response wins.
+    def __init__(self, url, pool=None, sink=None, chunk_size=64 * 1024,
+                 cache=None, retries=0, backoff=0.1, max_backoff=5.0,
+                 hedge=None):
+        Downloader.__init__(self, url)
+        self.pool = pool or shared_pool
+        self.sink = sink
+        self.chunk_size = chunk_size
+        self.cache = cache
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.hedge = hedge
+        self.attempts = 0
+        self.cached = None # True if the result came from the cache
+        self.bytes_read = 0
+        self.chunks = [] # (bytes, seconds) for each chunk streamed
+
+    def __str__(self):
+        # streamed bodies aren't kept in result, so report bytes_read
+        if self.exception or not self.completed:
+            return Downloader.__str__(self)
+        elif self.cache:
+            return "[%s] %s downloaded %dK in %.2fs (%s; cache %d hits, %d misses)" % \
+                (self.thread_used, self.url, self.bytes_read/1024, self.completed - self.started,
+                 self.cached and "hit" or "miss", self.cache.hits, self.cache.misses)
+        else:
+            return "[%s] %s downloaded %dK in %.2fs" % \
+                (self.thread_used, self.url, self.bytes_read/1024, self.completed - self.started)
+
+    def call(self):
+        self.thread_used = threading.currentThread().getName()
+        self.started = time.time()
+        try:
+            if self.sink is None:
+                body, validators = self.retrying(self.hedged_fetch)
+                # a hedged fetch runs twice, so only the winner's
+                # response is recorded
+                if self.cache is not None:
+                    self.cached = validators is None
+                    if validators is not None:
+                        self.cache.store(self.url, body, *validators)
+                self.result = body
+                self.bytes_read = len(body)
+            else:
+                self.retrying(self.stream)
+        except Exception, ex:
+            self.exception = ex
+        self.completed = time.time()
+        return self
+
+    # call fn, trying again after a backoff if it fails transiently
+    def retrying(self, fn):
+        while True:
+            self.attempts += 1
+            try:
+                return fn()
+            except Exception, ex:
+                if (self.attempts > self.retries or self.bytes_read or
+                        not retry.is_transient(ex)):
+                    raise
+                time.sleep(retry.backoff(self.attempts - 1, self.backoff,
+                                         self.max_backoff))
+
+    def hedged_fetch(self):
+        if self.hedge is None:
+            return self.fetch()
+        return self.hedge.call(self.fetch)
+
+    # fetch over a kept-alive connection from the pool, then give the
+    # connection back for the next download from the same host; returns
+    # (body, validators), validators being the response's etag and
+    # last-modified headers, or None if the body came from the cache
+    def fetch(self):
+        if self.cache is not None:
+            return self.fetch_cached()
+        response = self.pool.urlopen(self.url)
+        try:
+            body = response.read()
+        finally:
+            response.close()
+        return body, _validators(response)
+
+    # revalidate a cached copy; a 304 Not Modified means no body to download
+    def fetch_cached(self):
+        response = self.pool.urlopen(self.url, self.cache.validators(self.url))
+        try:
+            if response.status == 304:
+                # there is no body, but the response must still be read
+                # to the end for the pool to reuse the connection
+                response.read()
+                body = self.cache.get(self.url)
+                if body is not None:
+                    return body, None
+                # evicted since we asked for the validators
+                response.close()
+                response = self.pool.urlopen(self.url)
+            body = response.read()
+        finally:
+            response.close()
+        return body, _validators(response)
+
+    # write the body to the sink as it arrives; each chunk can be
+    # collected as soon as it has been written
+    def stream(self):
+        response = self.pool.urlopen(self.url)
+        try:
+            if isinstance(self.sink, basestring):
+                out = open(self.sink, 'wb')
+            else:
+                out = self.sink
+            try:
+                while True:
+                    start = time.time()
+                    chunk = response.read(self.chunk_size)
+                    if not chunk:
+                        break
+                    out.write(chunk)
+                    self.bytes_read += len(chunk)
+                    self.chunks.append((len(chunk), time.time() - start))
+            finally:
+                if out is not self.sink:
+                    out.close()
+        finally:
+            response.close()
@@ -0,0 +1,130 @@
+"""Remember which URLs a crawler has already seen, without keeping them
+all in memory."""
+
+from __future__ import with_statement
+from array import array
+import hashlib
+import math
+import os
+import struct
+import threading
+
+__all__ = ['BloomFilter', 'Frontier']
+
+class BloomFilter(object):
+    """A set that can only be added to and may wrongly report that it
+    contains a key, but never wrongly reports that it doesn't.
+
+    It is sized so that after 'capacity' keys have been added, about
+    'error_rate' of the keys that were never added test as present.
+    That takes about 1.2 bytes per key for a 1% error rate.
+    """
+    def __init__(self, capacity, error_rate=0.01):
+        bits = -capacity * math.log(error_rate) / math.log(2) ** 2
+        self.num_bits = max(8, int(math.ceil(bits)))
+        self.num_hashes = max(1, int(round(
+            self.num_bits * math.log(2) / capacity)))
+        self._bits = array('B', [0]) * ((self.num_bits + 7) // 8)
+
+    def __contains__(self, key):
+        for i in self._indexes(key):
+            if not self._bits[i >> 3] & (1 << (i & 7)):
+                return False
+        return True
+
+    def add(self, key):
+        """Add 'key', and return True if it was not (apparently) there."""
+        added = False
+        for i in self._indexes(key):
+            mask = 1 << (i & 7)
+            if not self._bits[i >> 3] & mask:
+                self._bits[i >> 3] |= mask
+                added = True
+        return added
+
+    def _indexes(self, key):
+        # double hashing: the i'th index is h1 + i * h2
+        h1, h2 = struct.unpack('>QQ', hashlib.md5(key).digest())
+        return [(h1 + i * h2) % self.num_bits for i in xrange(self.num_hashes)]
+
+class Frontier(object):
+    """The set of URLs a crawler has seen, kept exactly in files under
+    'directory' and screened in memory with a BloomFilter.
+
+    add(url) only has to read from disk when the Bloom filter says the
+    URL may already have been seen, which for new URLs happens about
+    'error_rate' of the time.  The URLs are spread over 'buckets' files
+    by hash, so each confirmation reads one small file, and the buckets
+    that have files are tracked so a URL whose bucket is still empty is
+    confirmed new without touching the disk.  An existing directory is
+    reloaded, so a crawl can be resumed.  Thread safe.
+    """
+    def __init__(self, directory, capacity=1000000, error_rate=0.01,
+                 buckets=256):
+        self.directory = directory
+        self.buckets = buckets
+        self.filter = BloomFilter(capacity, error_rate)
+        self.disk_reads = 0
+        self._count = 0
+        self._filled = set() # buckets with a file
+        self._lock = threading.Lock()
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        self._load()
+
+    def __len__(self):
+        return self._count
+
+    def __contains__(self, url):
+        with self._lock:
+            return url in self.filter and self._on_disk(url)
+
+    def add(self, url):
+        """Record 'url', and return True if it had not been seen before."""
+        with self._lock:
+            if not self.filter.add(url) and self._on_disk(url):
+                return False
+            bucket = self._bucket(url)
+            f = open(self._path(bucket), 'a')
+            try:
+                f.write(url + '\n')
+            finally:
+                f.close()
+            self._filled.add(bucket)
+            self._count += 1
+            return True
+
+    # _lock must be held, apart from in _load
+
+    def _on_disk(self, url):
+        bucket = self._bucket(url)
+        if bucket not in self._filled:
+            return False
+        self.disk_reads += 1
+        f = open(self._path(bucket))
+        try:
+            for line in f:
+                if line[:-1] == url:
+                    return True
+        finally:
+            f.close()
+        return False
+
+    def _load(self):
+        for name in os.listdir(self.directory):
+            if not name.endswith('.urls'):
+                continue
+            f = open(os.path.join(self.directory, name))
+            try:
+                for line in f:
+                    self.filter.add(line[:-1])
+                    self._count += 1
+            finally:
+                f.close()
+            self._filled.add(int(name[:-len('.urls')]))
+
+    def _bucket(self, url):
+        return int(hashlib.md5(url).hexdigest()[:8], 16) % self.buckets
+
+    def _path(self, bucket):
+        return os.path.join(self.directory, '%04d.urls' % bucket)
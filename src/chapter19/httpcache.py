@@ -0,0 +1,154 @@
+"""An on-disk cache of HTTP responses for conditional GETs."""
+
+from __future__ import with_statement
+import cPickle
+import hashlib
+import os
+import threading
+import time
+
+__all__ = ['HTTPCache']
+
+class HTTPCache(object):
+    """Cache response bodies by URL along with their ETag and
+    Last-Modified validators.
+
+    validators(url) gives the If-None-Match/If-Modified-Since headers to
+    send; when the server answers 304 Not Modified, get(url) returns the
+    cached body.  Each entry is a pair of files in 'directory', so the
+    cache survives between runs.  Once the bodies take more than
+    'max_bytes', the least recently used entries are evicted.
+
+    hits counts requests answered from the cache and misses those that
+    had to download the body.  All methods are thread safe.
+    """
+    def __init__(self, directory, max_bytes=64 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._entries = {}      # key -> metadata dict
+        self._size = 0
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        self._load()
+
+    def __str__(self):
+        return "%d hits, %d misses, %d entries, %dK" % (
+            self.hits, self.misses, len(self._entries), self._size / 1024)
+
+    def validators(self, url):
+        """Return the conditional request headers for 'url', if cached."""
+        with self._lock:
+            entry = self._entries.get(self._key(url))
+            headers = {}
+            if entry is not None:
+                if entry['etag']:
+                    headers['If-None-Match'] = entry['etag']
+                if entry['last_modified']:
+                    headers['If-Modified-Since'] = entry['last_modified']
+            return headers
+
+    def get(self, url):
+        """Return the cached body of 'url' and count a hit, or None."""
+        key = self._key(url)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            entry['last_used'] = time.time()
+            self._write_meta(key, entry)
+            try:
+                f = open(self._path(key, 'body'), 'rb')
+                try:
+                    body = f.read()
+                finally:
+                    f.close()
+            except IOError:
+                self._remove(key)
+                return None
+            self.hits += 1
+            return body
+
+    def store(self, url, body, etag=None, last_modified=None):
+        """Count a miss, and cache 'body' if it has a validator."""
+        key = self._key(url)
+        with self._lock:
+            self.misses += 1
+            if key in self._entries:
+                self._remove(key)
+            if not (etag or last_modified) or len(body) > self.max_bytes:
+                return
+            entry = {'url': url, 'etag': etag, 'last_modified': last_modified,
+                     'size': len(body), 'last_used': time.time()}
+            f = open(self._path(key, 'body'), 'wb')
+            try:
+                f.write(body)
+            finally:
+                f.close()
+            self._write_meta(key, entry)
+            self._entries[key] = entry
+            self._size += entry['size']
+            self._evict()
+
+    def clear(self):
+        """Remove every entry."""
+        with self._lock:
+            for key in self._entries.keys():
+                self._remove(key)
+
+    # These are only called with _lock held, apart from _load which is
+    # called before the cache is shared
+
+    def _evict(self):
+        if self._size <= self.max_bytes:
+            return
+        by_age = sorted(self._entries.items(),
+                        key=lambda item: item[1]['last_used'])
+        for key, entry in by_age:
+            if self._size <= self.max_bytes:
+                break
+            self._remove(key)
+            self.evictions += 1
+
+    def _remove(self, key):
+        entry = self._entries.pop(key)
+        self._size -= entry['size']
+        for suffix in ('meta', 'body'):
+            try:
+                os.remove(self._path(key, suffix))
+            except OSError:
+                pass
+
+    def _write_meta(self, key, entry):
+        f = open(self._path(key, 'meta'), 'wb')
+        try:
+            cPickle.dump(entry, f, cPickle.HIGHEST_PROTOCOL)
+        finally:
+            f.close()
+
+    def _load(self):
+        for name in os.listdir(self.directory):
+            key, ext = os.path.splitext(name)
+            if ext != '.meta':
+                continue
+            try:
+                f = open(os.path.join(self.directory, name), 'rb')
+                try:
+                    entry = cPickle.load(f)
+                finally:
+                    f.close()
+            except (IOError, EOFError, cPickle.UnpicklingError):
+                continue
+            if os.path.exists(self._path(key, 'body')):
+                self._entries[key] = entry
+                self._size += entry['size']
+        self._evict()
+
+    def _key(self, url):
+        return hashlib.md5(url).hexdigest()
+
+    def _path(self, key, suffix):
+        return os.path.join(self.directory, '%s.%s' % (key, suffix))
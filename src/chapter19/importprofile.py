@@ -0,0 +1,167 @@
+"""Measure how long each module takes to import.
+
+An ImportProfiler wraps __import__ and times every import that loads a
+new module, noting which import triggered it.  Each module's total time
+includes the imports it makes; its self time does not.
+
+    profiler = ImportProfiler().install()
+    import hello.window, hello.speech
+    profiler.uninstall()
+    print profiler.report()
+    profiler.write_folded('imports.folded')
+
+write_folded() writes one "outer;inner;module <self microseconds>" line
+per module, the folded-stack format read by flamegraph.pl and
+speedscope, so the slowest import chains stand out as the widest bars.
+
+Run as a script, it profiles the imports of another script:
+
+    jython importprofile.py -o main.folded main.py --ui console Bob
+"""
+
+from __future__ import with_statement
+import __builtin__
+import sys
+import threading
+import time
+
+__all__ = ['ImportProfiler']
+
+class _Frame(object):
+    def __init__(self, name, parent):
+        self.name = name
+        self.parent = parent
+        self.children = 0.0 # seconds spent in nested imports
+        if parent is None:
+            self.path = (name,)
+        else:
+            self.path = parent.path + (name,)
+
+class ImportProfiler(object):
+    """Record the time spent importing each module.
+
+    'records' holds a (path, total, self) tuple per module loaded, in
+    the order the imports finished, where path is the tuple of module
+    names from the outermost import down to this one and its length is
+    the nesting depth.  Times are in seconds.  Imports on every thread
+    are recorded, each thread with its own nesting.
+    """
+    def __init__(self):
+        self.records = []
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._original_import = None
+        self._import = None
+
+    def install(self):
+        self._original_import = __builtin__.__import__
+        self._import = self._make_import()
+        __builtin__.__import__ = self._import
+        return self
+
+    def uninstall(self):
+        if __builtin__.__import__ is self._import:
+            __builtin__.__import__ = self._original_import
+
+    def report(self, limit=None, sort='total'):
+        """Return a table of the imports, slowest first.
+
+        With sort='total' (the default), nested imports are indented
+        under the one that triggered them.  With sort='self' the modules
+        are ordered by the time spent in their own code, and each is
+        shown with the chain of imports that loaded it.
+        """
+        if sort not in ('total', 'self'):
+            raise ValueError("'sort' must be 'total' or 'self'")
+        lines = ['%10s %10s  %s' % ('total ms', 'self ms', 'module')]
+        with self._lock:
+            records = self.records[:]
+        if sort == 'total':
+            records.sort(key=lambda record: -record[1])
+        else:
+            records.sort(key=lambda record: -record[2])
+        for path, total, self_time in records[:limit]:
+            if sort == 'total':
+                name = '  ' * (len(path) - 1) + path[-1]
+            else:
+                name = ' > '.join(path)
+            lines.append('%10.1f %10.1f  %s' % (
+                total * 1e3, self_time * 1e3, name))
+        return '\n'.join(lines)
+
+    def folded(self):
+        """Return the self times in folded-stack format, in microseconds."""
+        stacks = {}
+        with self._lock:
+            for path, total, self_time in self.records:
+                key = ';'.join(path)
+                stacks[key] = stacks.get(key, 0) + self_time
+        return ['%s %d' % (stack, round(seconds * 1e6))
+                for stack, seconds in sorted(stacks.items())]
+
+    def write_folded(self, path):
+        f = open(path, 'w')
+        try:
+            for line in self.folded():
+                f.write(line + '\n')
+        finally:
+            f.close()
+
+    def _make_import(self):
+        original = self._original_import
+        local = self._local
+        modules = sys.modules
+        def _import(name, globals=None, locals=None, fromlist=None, level=-1):
+            # only time imports that may load something; importing a
+            # module that is already loaded costs next to nothing
+            if name in modules and not fromlist:
+                return original(name, globals, locals, fromlist, level)
+            before = len(modules)
+            parent = getattr(local, 'frame', None)
+            frame = local.frame = _Frame(name, parent)
+            start = time.time()
+            try:
+                return original(name, globals, locals, fromlist, level)
+            finally:
+                total = time.time() - start
+                local.frame = parent
+                if parent is not None:
+                    parent.children += total
+                if len(modules) > before:
+                    with self._lock:
+                        self.records.append(
+                            (frame.path, total, total - frame.children))
+        return _import
+
+def main(args):
+    from optparse import OptionParser
+    import os
+    parser = OptionParser(usage='%prog [options] script [args...]')
+    parser.disable_interspersed_args()
+    parser.add_option('-o', '--output', dest='output', default=None,
+                      help='write folded stacks for a flame graph to this file')
+    parser.add_option('-n', '--limit', dest='limit', type='int', default=30,
+                      help='number of imports to report')
+    parser.add_option('-s', '--sort', dest='sort', default='total',
+                      choices=['total', 'self'],
+                      help='order the report by total or self time')
+    options, args = parser.parse_args(args)
+    if not args:
+        parser.error('no script to profile')
+    script = args[0]
+    sys.argv = args
+    sys.path.insert(0, os.path.dirname(os.path.abspath(script)))
+    profiler = ImportProfiler().install()
+    try:
+        try:
+            execfile(script, {'__name__': '__main__', '__file__': script})
+        except SystemExit:
+            pass
+    finally:
+        profiler.uninstall()
+        print >> sys.stderr, profiler.report(options.limit, options.sort)
+        if options.output:
+            profiler.write_folded(options.output)
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,140 @@
+"""A local HTTP/1.1 server to run the download examples against.
+
+The chapter's download examples fetch live sites, which makes them
+impossible to measure reproducibly.  This server answers every GET with
+a body of configurable size on a keep-alive connection, optionally
+after a random delay or with an error, so the examples can be pointed at
+it instead:
+
+    server = start_server(body_size=16 * 1024)
+    urls = [server.url('/page/%d' % i) for i in xrange(100)]
+    ...
+    server.stop()
+"""
+
+from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+from SocketServer import ThreadingMixIn
+import random
+import socket
+import sys
+import threading
+import time
+
+__all__ = ['LocalServer', 'start_server']
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def setup(self):
+        # headers and body are written separately; don't let Nagle's
+        # algorithm hold the body back waiting for a delayed ACK
+        self.request.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        BaseHTTPRequestHandler.setup(self)
+        self.server._count_connection()
+
+    def do_GET(self):
+        delay = self.server.delay()
+        if delay:
+            time.sleep(delay)
+        if self.server.error_rate and random.random() < self.server.error_rate:
+            self.send_response(500)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        body = self.server.body
+        etag = self.server.etag
+        if self.headers.getheader('if-none-match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('ETag', etag)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+class LocalServer(ThreadingMixIn, HTTPServer):
+    """Serve GET requests on 127.0.0.1 from a background thread, one
+    thread per connection.
+
+    'connections' counts the TCP connections accepted so far, which
+    shows whether clients are reusing them.  Every page has the same
+    ETag, and a conditional GET that sends it gets a 304 Not Modified.
+
+    If 'latency' is given, each response is delayed by a random time
+    with that mean, exponentially distributed so a few are much slower
+    than the rest.  'error_rate' is the fraction of requests answered
+    with 500 Internal Server Error.
+    """
+    daemon_threads = True
+    allow_reuse_address = True
+    request_queue_size = 1024
+
+    def __init__(self, port=0, body_size=1024, handler=_Handler, latency=0.0,
+                 error_rate=0.0):
+        HTTPServer.__init__(self, ('127.0.0.1', port), handler)
+        self.body = 'x' * body_size
+        self.latency = latency
+        self.error_rate = error_rate
+        self.etag = '"%d"' % body_size
+        self.connections = 0
+        self._lock = threading.Lock()
+        self._stopped = False
+        self._thread = None
+
+    def url(self, path='/'):
+        return 'http://127.0.0.1:%d%s' % (self.server_address[1], path)
+
+    def delay(self):
+        """Return how long to hold back the next response."""
+        if not self.latency:
+            return 0.0
+        return random.expovariate(1.0 / self.latency)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._serve)
+        self._thread.setDaemon(True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped = True
+        # handle_request() blocks in accept(), so connect once to wake it
+        s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        try:
+            try:
+                s.connect(self.server_address)
+            except socket.error:
+                pass
+        finally:
+            s.close()
+        self._thread.join(5)
+        self.server_close()
+
+    def handle_error(self, request, client_address):
+        # clients dropping their kept-alive connections are expected
+        if not isinstance(sys.exc_info()[1], socket.error):
+            HTTPServer.handle_error(self, request, client_address)
+
+    def _serve(self):
+        while not self._stopped:
+            self.handle_request()
+
+    def _count_connection(self):
+        self._lock.acquire()
+        try:
+            self.connections += 1
+        finally:
+            self._lock.release()
+
+def start_server(port=0, body_size=1024, latency=0.0, error_rate=0.0):
+    """Start a LocalServer on 'port' (any free port by default)."""
+    server = LocalServer(port, body_size, latency=latency,
+                         error_rate=error_rate)
+    server.start()
+    return server
@@ -0,0 +1,101 @@
+"""Queues that hand out their items in an order other than FIFO."""
+
+from __future__ import with_statement
+from time import time as _time
+from Queue import Empty
+from batchqueue import BatchQueue, _endtime, _notify
+import heapq
+
+__all__ = ['PriorityQueue', 'LifoQueue', 'DelayQueue']
+
+class PriorityQueue(BatchQueue):
+    """Variant of Queue that retrieves open entries in priority order
+    (lowest first).
+
+    Entries are typically tuples of the form:  (priority number, data).
+    They are kept in a binary heap, so put() and get() are O(log n).
+    """
+
+    def _init(self, maxsize):
+        self.maxsize = maxsize
+        self.queue = []
+
+    def _put(self, item, heappush=heapq.heappush):
+        heappush(self.queue, item)
+
+    def _get(self, heappop=heapq.heappop):
+        return heappop(self.queue)
+
+
+class LifoQueue(BatchQueue):
+    """Variant of Queue that retrieves most recently added entries first.
+
+    The most recently added entries are the ones most likely to still be
+    in a processor cache, which makes this a good fit for scheduling
+    work as a stack.
+    """
+
+    def _init(self, maxsize):
+        self.maxsize = maxsize
+        self.queue = []
+
+    def _put(self, item):
+        self.queue.append(item)
+
+    def _get(self):
+        return self.queue.pop()
+
+
+class DelayQueue(PriorityQueue):
+    """Variant of PriorityQueue whose entries can only be retrieved once
+    their deadline has passed.
+
+    Entries are tuples of the form:  (deadline, data), where deadline is
+    a time.time() value.  A blocking get() sleeps until the earliest
+    deadline (or until an entry with an earlier one is put) instead of
+    polling.  qsize(), empty() and full() count every entry, expired or
+    not.
+    """
+
+    def get(self, block=True, timeout=None):
+        with self.not_empty:
+            self._wait_expired(block, _endtime(block, timeout))
+            item = self._get()
+            self.not_full.notify()
+            return item
+    get.__doc__ = BatchQueue.get.__doc__
+
+    def get_many(self, max_items=None, block=True, timeout=None):
+        if max_items is not None and max_items < 1:
+            raise ValueError("'max_items' must be a positive number")
+        with self.not_empty:
+            self._wait_expired(block, _endtime(block, timeout))
+            items = []
+            try:
+                while self._expired() and \
+                        (max_items is None or len(items) < max_items):
+                    items.append(self._get())
+            finally:
+                _notify(self.not_full, len(items))
+            return items
+    get_many.__doc__ = BatchQueue.get_many.__doc__
+
+    # Wait until the earliest entry has expired; not_empty must be held
+    def _wait_expired(self, block, endtime):
+        while not self._expired():
+            if not block:
+                raise Empty
+            delay = None
+            if not self._empty():
+                delay = self.queue[0][0] - _time()
+            if endtime is not None:
+                remaining = endtime - _time()
+                if remaining <= 0.0:
+                    raise Empty
+                if delay is None or remaining < delay:
+                    delay = remaining
+            self.not_empty.wait(delay)
+
+    # Check whether the earliest entry's deadline has passed
+    def _expired(self):
+        return not self._empty() and self.queue[0][0] <= _time()
@@ -0,0 +1,130 @@
+"""Per-host concurrency limits and request rates for a crawler."""
+
+from __future__ import with_statement
+from collections import deque
+from java.lang import Runnable
+from java.util.concurrent import Callable, Executors, TimeUnit
+import threading
+import time
+import urlparse
+
+__all__ = ['TokenBucket', 'HostScheduler']
+
+class TokenBucket(object):
+    """Allow 'rate' requests per second on average, in bursts of up to
+    'burst' requests."""
+
+    def __init__(self, rate, burst=1):
+        self.rate = float(rate)
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.time()
+
+    def take(self):
+        """Take a token and return 0, or return how many seconds to wait
+        until one is available."""
+        now = time.time()
+        self.tokens = min(self.burst,
+                          self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1.0:
+            self.tokens -= 1.0
+            return 0.0
+        return (1.0 - self.tokens) / self.rate
+
+class _Host(object):
+    def __init__(self, bucket):
+        self.pending = deque()
+        self.in_flight = 0
+        self.bucket = bucket
+        self.retry_scheduled = False
+
+class _PoliteTask(Callable):
+    # Runs a downloader, then frees its host's slot
+    def __init__(self, scheduler, host, downloader):
+        self.scheduler = scheduler
+        self.host = host
+        self.downloader = downloader
+
+    def call(self):
+        try:
+            return self.downloader.call()
+        finally:
+            self.scheduler._done(self.host)
+
+class _Retry(Runnable):
+    def __init__(self, scheduler, host):
+        self.scheduler = scheduler
+        self.host = host
+
+    def run(self):
+        self.scheduler._retry(self.host)
+
+class HostScheduler(object):
+    """Submit downloaders to a completion service, but run at most
+    'max_per_host' at a time against any one host and, if 'rate' is
+    given, start at most 'rate' per second per host (in bursts of up to
+    'burst').
+
+    Downloaders for a busy host wait here, not in the executor, so pool
+    threads are never blocked on politeness and other hosts' downloads
+    keep flowing.  Results are taken from the completion service as
+    usual.  Call shutdown() when done to stop the retry timer.
+    """
+
+    def __init__(self, completion_service, max_per_host=2, rate=None, burst=1):
+        self.completion_service = completion_service
+        self.max_per_host = max_per_host
+        self.rate = rate
+        self.burst = burst
+        self._hosts = {}
+        self._lock = threading.Lock()
+        self._timer = Executors.newSingleThreadScheduledExecutor()
+
+    def submit(self, downloader):
+        host = urlparse.urlsplit(downloader.url)[1].lower()
+        with self._lock:
+            state = self._hosts.get(host)
+            if state is None:
+                bucket = None
+                if self.rate is not None:
+                    bucket = TokenBucket(self.rate, self.burst)
+                state = self._hosts[host] = _Host(bucket)
+            state.pending.append(downloader)
+            self._dispatch(host, state)
+
+    def pending(self):
+        """Return the number of downloaders waiting on their host."""
+        with self._lock:
+            return sum([len(state.pending) for state in self._hosts.values()])
+
+    def shutdown(self):
+        self._timer.shutdownNow()
+
+    def _dispatch(self, host, state):
+        # _lock must be held
+        while state.pending and state.in_flight < self.max_per_host:
+            if state.bucket is not None:
+                wait = state.bucket.take()
+                if wait > 0:
+                    if not state.retry_scheduled:
+                        state.retry_scheduled = True
+                        self._timer.schedule(_Retry(self, host),
+                                             int(wait * 1000) + 1,
+                                             TimeUnit.MILLISECONDS)
+                    return
+            state.in_flight += 1
+            self.completion_service.submit(
+                _PoliteTask(self, host, state.pending.popleft()))
+
+    def _done(self, host):
+        with self._lock:
+            state = self._hosts[host]
+            state.in_flight -= 1
+            self._dispatch(host, state)
+
+    def _retry(self, host):
+        with self._lock:
+            state = self._hosts[host]
+            state.retry_scheduled = False
+            self._dispatch(host, state)
@@ -0,0 +1,166 @@
+"""Import modules on background threads while the application starts.
+
+background_import.py imports one module on a thread while the main
+thread gets on with something else.  A Preloader does the same for a
+list of modules, on a small pool of threads, and an import statement
+for a module that is still being preloaded waits for that import to
+finish instead of starting another:
+
+    import preloader
+    preloader.preload(['xml.dom.minidom', 'javax.swing'])
+    ... set up the application ...
+    import xml.dom.minidom      # already done, or joins the preload
+
+The modules an application ends up importing can be recorded on one run
+and preloaded on the next:
+
+    preloader.record('modules.txt')         # writes the list at exit
+    preloader.preload(path='modules.txt')
+
+Python 2 has a single import lock, held for the whole of each import,
+and Jython 2.5 has the same.  So the workers' imports run one at a time
+and more threads don't make preloading any faster, and while a worker
+is importing, any other import in the application waits for it too.
+The gain is that the main thread gets on with work that doesn't import
+in the meantime.
+"""
+
+from __future__ import with_statement
+from collections import deque
+import __builtin__
+import atexit
+import imp
+import sys
+import threading
+import time
+
+__all__ = ['Preloader', 'preload', 'record', 'read_modules']
+
+class Preloader(object):
+    """Import 'modules' on 'threads' daemon threads.
+
+    While it runs, __import__ is wrapped so that importing a module
+    that a worker is still importing blocks until the worker is done.
+    Modules that fail to import, with any exception including
+    SystemExit, are skipped and their exceptions kept in 'errors'; the
+    application's own import raises as usual.
+    'imported' maps each module preloaded to the seconds it took.
+    """
+    def __init__(self, modules, threads=2):
+        self.modules = []
+        for name in modules:
+            if name not in self.modules:
+                self.modules.append(name)
+        self.threads = threads
+        self.imported = {}
+        self.errors = {}
+        self._pending = deque(self.modules)
+        self._in_flight = dict([(name, threading.Event())
+                                for name in self.modules])
+        self._lock = threading.Lock()
+        self._workers = []
+        self._running = 0
+        self._import = None
+        self._original_import = None
+
+    def start(self):
+        self._original_import = __builtin__.__import__
+        self._import = self._make_import()
+        __builtin__.__import__ = self._import
+        self._running = max(1, min(self.threads, len(self.modules)))
+        for i in xrange(self._running):
+            worker = threading.Thread(target=self._work,
+                                      name='Preloader-%d' % i)
+            worker.setDaemon(True)
+            self._workers.append(worker)
+        for worker in self._workers:
+            worker.start()
+        return self
+
+    def join(self, timeout=None):
+        """Wait for every module to be imported (or fail)."""
+        for worker in self._workers:
+            worker.join(timeout)
+
+    def done(self):
+        with self._lock:
+            return self._running == 0
+
+    def _work(self):
+        try:
+            while True:
+                try:
+                    name = self._pending.popleft()
+                except IndexError:
+                    return
+                start = time.time()
+                try:
+                    try:
+                        self._original_import(name)
+                        self.imported[name] = time.time() - start
+                    except:
+                        # a module may raise anything at all, and the
+                        # application's import of it must not wait forever
+                        self.errors[name] = sys.exc_info()[1]
+                finally:
+                    self._in_flight.pop(name).set()
+        finally:
+            with self._lock:
+                self._running -= 1
+                if self._running == 0:
+                    self._uninstall()
+
+    def _uninstall(self):
+        # leave the hook alone if someone has wrapped it since
+        if __builtin__.__import__ is self._import:
+            __builtin__.__import__ = self._original_import
+
+    def _make_import(self):
+        original = self._original_import
+        in_flight = self._in_flight
+        workers = self._workers
+        def _import(name, *args, **kwargs):
+            event = in_flight.get(name)
+            # workers never wait on each other, or two modules that
+            # import each other could deadlock; and while the import
+            # lock is held, the regular import already waits for it
+            if (event is not None and not imp.lock_held() and
+                    threading.currentThread() not in workers):
+                event.wait()
+            return original(name, *args, **kwargs)
+        return _import
+
+def read_modules(path):
+    """Return the module names listed in 'path', one per line."""
+    f = open(path)
+    try:
+        return [line.strip() for line in f
+                if line.strip() and not line.startswith('#')]
+    finally:
+        f.close()
+
+def preload(modules=None, path=None, threads=2):
+    """Start preloading 'modules' plus those listed in 'path', if it
+    exists, and return the Preloader."""
+    modules = list(modules or [])
+    if path is not None:
+        try:
+            modules.extend([name for name in read_modules(path)
+                            if name not in modules])
+        except IOError:
+            pass
+    return Preloader(modules, threads).start()
+
+def record(path):
+    """At exit, write the modules imported since now to 'path'."""
+    before = set(sys.modules)
+    def write():
+        names = sorted([name for name, module in sys.modules.items()
+                        if module is not None and name not in before])
+        f = open(path, 'w')
+        try:
+            for name in names:
+                f.write(name + '\n')
+        finally:
+            f.close()
+    atexit.register(write)
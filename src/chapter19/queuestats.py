@@ -0,0 +1,234 @@
+"""Opt-in instrumentation for Queue objects.
+
+instrument(q) attaches a QueueStats to a queue and returns it; queues
+that are never instrumented pay nothing.  The stats can be read as a
+dict with snapshot(), or published to JMX with register_mbean() when
+running on Jython.
+"""
+
+from __future__ import with_statement
+from bisect import bisect_left
+from collections import deque
+from orderedqueue import LifoQueue, PriorityQueue
+from time import time as _time
+import warnings
+
+__all__ = ['QueueStats', 'instrument', 'register_mbean', 'LATENCY_BUCKETS']
+
+# Upper bounds, in seconds, of the put-to-get latency histogram buckets;
+# the last bucket counts everything slower than LATENCY_BUCKETS[-1].
+LATENCY_BUCKETS = (0.00001, 0.0001, 0.001, 0.01, 0.1, 1.0, 10.0)
+
+class QueueStats(object):
+    """Counters for one queue.
+
+    Each counter is only updated while the queue lock for its side is
+    held (the tail for puts, the head for gets), so updating them needs
+    no extra locking.  snapshot() reads them without locking, so its
+    values may be very slightly inconsistent with each other.
+    """
+    def __init__(self, depth=0, latency=True):
+        self.started = _time()
+        self.initial_depth = depth
+        self.enqueued = 0
+        self.dequeued = 0
+        self.high_water = depth
+        self.put_waits = 0
+        self.put_wait_time = 0.0
+        self.get_waits = 0
+        self.get_wait_time = 0.0
+        self.latency = latency
+        self.latency_total = 0.0
+        self.latency_histogram = [0] * (len(LATENCY_BUCKETS) + 1)
+        self._put_times = deque()
+        # items already queued when instrumented have no put time
+        self._untimed = depth
+
+    def snapshot(self):
+        """Return the current values of all counters as a dict."""
+        elapsed = _time() - self.started
+        latency_count = sum(self.latency_histogram)
+        return {
+            'elapsed': elapsed,
+            'enqueued': self.enqueued,
+            'dequeued': self.dequeued,
+            'enqueue_rate': elapsed and self.enqueued / elapsed,
+            'dequeue_rate': elapsed and self.dequeued / elapsed,
+            'depth': self.initial_depth + self.enqueued - self.dequeued,
+            'high_water': self.high_water,
+            'put_waits': self.put_waits,
+            'put_wait_time': self.put_wait_time,
+            'get_waits': self.get_waits,
+            'get_wait_time': self.get_wait_time,
+            'latency_count': latency_count,
+            'latency_mean': latency_count and \
+                self.latency_total / latency_count or 0.0,
+            'latency_histogram': list(self.latency_histogram),
+        }
+
+    def _record_put(self):
+        self.enqueued += 1
+        depth = self.initial_depth + self.enqueued - self.dequeued
+        if depth > self.high_water:
+            self.high_water = depth
+        if self.latency:
+            self._put_times.append(_time())
+
+    def _record_get(self):
+        self.dequeued += 1
+        if not self.latency:
+            return
+        if self._untimed:
+            self._untimed -= 1
+            return
+        latency = _time() - self._put_times.popleft()
+        self.latency_total += latency
+        self.latency_histogram[bisect_left(LATENCY_BUCKETS, latency)] += 1
+
+    def _record_put_wait(self, waited):
+        self.put_waits += 1
+        self.put_wait_time += waited
+
+    def _record_get_wait(self, waited):
+        self.get_waits += 1
+        self.get_wait_time += waited
+
+class _TimedCondition(object):
+    # Wraps one of a queue's conditions to time how long callers wait on it
+    def __init__(self, condition, record):
+        self._condition = condition
+        self._record = record
+
+    def __enter__(self):
+        return self._condition.__enter__()
+
+    def __exit__(self, *exc_info):
+        return self._condition.__exit__(*exc_info)
+
+    def acquire(self, *args):
+        return self._condition.acquire(*args)
+
+    def release(self):
+        self._condition.release()
+
+    def wait(self, timeout=None):
+        start = _time()
+        try:
+            if timeout is None:
+                self._condition.wait()
+            else:
+                self._condition.wait(timeout)
+        finally:
+            self._record(_time() - start)
+
+    def notify(self):
+        self._condition.notify()
+
+    def notifyAll(self):
+        self._condition.notifyAll()
+
+def instrument(queue, latency=None):
+    """Attach a QueueStats to 'queue' (as queue.stats) and return it.
+
+    The queue's _put/_get hooks and its not_full/not_empty conditions are
+    wrapped on this instance only, so call this before the queue is
+    shared with other threads.  Put-to-get latency pairs each get with
+    the oldest put, so it is only recorded for FIFO queues unless
+    'latency' says otherwise.
+    """
+    if latency is None:
+        latency = not isinstance(queue, (PriorityQueue, LifoQueue))
+    stats = QueueStats(queue.qsize(), latency)
+    put, get = queue._put, queue._get
+    def _put(item):
+        put(item)
+        stats._record_put()
+    def _get():
+        item = get()
+        stats._record_get()
+        return item
+    queue._put = _put
+    queue._get = _get
+    queue.not_full = _TimedCondition(queue.not_full, stats._record_put_wait)
+    queue.not_empty = _TimedCondition(queue.not_empty, stats._record_get_wait)
+    queue.stats = stats
+    return stats
+
+try:
+    from java.lang import Double, Long
+    from java.lang.management import ManagementFactory
+    from javax.management import Attribute, AttributeList, \
+        AttributeNotFoundException, DynamicMBean, MBeanAttributeInfo, \
+        MBeanInfo, ObjectName
+    import jarray
+except ImportError:
+    DynamicMBean = None
+
+if DynamicMBean is not None:
+    class QueueStatsMBean(DynamicMBean):
+        """Read-only DynamicMBean exposing a QueueStats snapshot."""
+        def __init__(self, stats):
+            self.stats = stats
+
+        def getAttribute(self, name):
+            snapshot = self.stats.snapshot()
+            if name not in snapshot:
+                raise AttributeNotFoundException(name)
+            return self._to_java(snapshot[name])
+
+        def getAttributes(self, names):
+            snapshot = self.stats.snapshot()
+            attributes = AttributeList()
+            for name in names:
+                if name in snapshot:
+                    attributes.add(Attribute(name, self._to_java(snapshot[name])))
+            return attributes
+
+        def setAttribute(self, attribute):
+            raise AttributeNotFoundException(attribute.getName())
+
+        def setAttributes(self, attributes):
+            return AttributeList()
+
+        def invoke(self, name, params, signature):
+            raise AttributeNotFoundException(name)
+
+        def getMBeanInfo(self):
+            attributes = []
+            for name, value in sorted(self.stats.snapshot().items()):
+                if isinstance(value, list):
+                    java_type = '[J'
+                elif isinstance(value, float):
+                    java_type = 'java.lang.Double'
+                else:
+                    java_type = 'java.lang.Long'
+                attributes.append(MBeanAttributeInfo(
+                    name, java_type, name, True, False, False))
+            return MBeanInfo(self.__class__.__name__, 'Queue statistics',
+                             attributes, None, None, None)
+
+        def _to_java(self, value):
+            if isinstance(value, list):
+                return jarray.array(value, 'l')
+            elif isinstance(value, float):
+                return Double(value)
+            return Long(value)
+
+def register_mbean(stats, name):
+    """Register 'stats' with the platform MBean server under 'name'.
+
+    For example, register_mbean(stats, 'chapter19:type=Queue,name=work')
+    makes the counters visible in JConsole or any other JMX client, and
+    returns the ObjectName.  Without the Java management classes (that
+    is, outside of Jython) nothing is registered: a RuntimeWarning is
+    issued and None is returned, so callers can register
+    unconditionally.
+    """
+    if DynamicMBean is None:
+        warnings.warn('JMX is not available, so queue stats %r were not '
+                      'registered' % name, RuntimeWarning, stacklevel=2)
+        return None
+    server = ManagementFactory.getPlatformMBeanServer()
+    object_name = ObjectName(name)
+    server.registerMBean(QueueStatsMBean(stats), object_name)
+    return object_name
@@ -0,0 +1,121 @@
+"""Retrying transient download errors, and hedging slow requests."""
+
+from __future__ import with_statement
+import httplib
+import random
+import socket
+import sys
+import threading
+import time
+import urllib2
+
+__all__ = ['TRANSIENT_STATUSES', 'is_transient', 'backoff', 'Hedge']
+
+# server errors that are worth trying again
+TRANSIENT_STATUSES = (408, 429, 500, 502, 503, 504)
+
+def is_transient(ex):
+    """Return True if a download that raised 'ex' may succeed if retried."""
+    if isinstance(ex, urllib2.HTTPError):
+        return ex.code in TRANSIENT_STATUSES
+    return isinstance(ex, (socket.error, httplib.HTTPException,
+                           urllib2.URLError))
+
+def backoff(attempt, base=0.1, maximum=5.0):
+    """Return how long to sleep before retry number 'attempt' (from 0):
+    a random time up to base * 2**attempt seconds, capped at 'maximum'.
+
+    The jitter keeps clients that failed together from retrying in
+    lockstep.
+    """
+    return random.uniform(0, min(maximum, base * 2 ** attempt))
+
+class Hedge(object):
+    """Send a second, duplicate request when the first is slower than
+    the 'percentile' of recent latencies, and use whichever answers
+    first.
+
+    One Hedge is shared by all the requests whose latencies should be
+    compared, such as every Downloader in a batch.  Until 'min_samples'
+    requests have completed there is nothing to compare with, so none
+    are hedged.  The latencies of the last 'window' successful requests
+    are kept.  'hedged' counts the duplicates sent and 'won' how many of
+    them answered first.
+    """
+    def __init__(self, percentile=95, min_samples=20, window=200):
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.window = window
+        self.hedged = 0
+        self.won = 0
+        self._latencies = []
+        self._next = 0
+        self._lock = threading.Lock()
+
+    def record(self, seconds):
+        with self._lock:
+            if len(self._latencies) < self.window:
+                self._latencies.append(seconds)
+            else:
+                self._latencies[self._next] = seconds
+                self._next = (self._next + 1) % self.window
+
+    def delay(self):
+        """Return how long to wait before hedging, or None to not hedge."""
+        with self._lock:
+            if len(self._latencies) < self.min_samples:
+                return None
+            latencies = sorted(self._latencies)
+        index = min(len(latencies) - 1,
+                    int(len(latencies) * self.percentile / 100.0))
+        return latencies[index]
+
+    def call(self, fn):
+        """Return fn(), calling it again on another thread if the first
+        call takes longer than delay().
+
+        The first call to succeed wins; the other's result is discarded.
+        If both fail, the first failure is raised.
+        """
+        delay = self.delay()
+        if delay is None:
+            start = time.time()
+            result = fn()
+            self.record(time.time() - start)
+            return result
+        done = threading.Condition()
+        outcomes = [] # (attempt, result, exc_info)
+        def attempt(n):
+            start = time.time()
+            try:
+                outcome = (n, fn(), None)
+                self.record(time.time() - start)
+            except:
+                outcome = (n, None, sys.exc_info())
+            with done:
+                outcomes.append(outcome)
+                done.notifyAll()
+        def launch(n):
+            t = threading.Thread(target=attempt, args=(n,))
+            t.setDaemon(True)
+            t.start()
+        with done:
+            launch(0)
+            launched = 1
+            done.wait(delay)
+            if not outcomes:
+                launch(1)
+                launched = 2
+                with self._lock:
+                    self.hedged += 1
+            while True:
+                for n, result, exc_info in outcomes:
+                    if exc_info is None:
+                        if n:
+                            with self._lock:
+                                self.won += 1
+                        return result
+                if len(outcomes) == launched:
+                    exc_info = outcomes[0][2]
+                    raise exc_info[0], exc_info[1], exc_info[2]
+                done.wait()
@@ -0,0 +1,45 @@
+"""A bounded queue that stores its items in a preallocated ring."""
+
+from batchqueue import BatchQueue
+
+__all__ = ['RingQueue']
+
+class RingQueue(BatchQueue):
+    """Variant of Queue backed by a preallocated, fixed-size ring.
+
+    maxsize must be > 0.  The slots are allocated once, up front, and
+    items are stored and retrieved by moving head and tail indices
+    around the ring, so a steady stream of puts and gets does not
+    allocate any memory inside the queue.
+    """
+
+    def _init(self, maxsize):
+        if maxsize <= 0:
+            raise ValueError("RingQueue requires a positive 'maxsize'")
+        self.maxsize = maxsize
+        self.queue = [None] * maxsize
+        self._head = 0   # index of the next item to get
+        self._tail = 0   # index of the next free slot to put into
+        self._count = 0
+
+    def _qsize(self):
+        return self._count
+
+    def _empty(self):
+        return not self._count
+
+    def _full(self):
+        return self._count == self.maxsize
+
+    def _put(self, item):
+        self.queue[self._tail] = item
+        self._tail = (self._tail + 1) % self.maxsize
+        self._count += 1
+
+    def _get(self):
+        item = self.queue[self._head]
+        # drop the ring's reference so the item can be collected
+        self.queue[self._head] = None
+        self._head = (self._head + 1) % self.maxsize
+        self._count -= 1
+        return item
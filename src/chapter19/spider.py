@@ -0,0 +1,65 @@
+"""Follow the links in downloaded pages, feeding new URLs back to a
+completion service."""
+
+import re
+import urlparse
+
+__all__ = ['extract_links', 'same_hosts', 'crawl']
+
+_HREF = re.compile(r'''<a\s[^>]*?href\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s>]+))''',
+                   re.IGNORECASE)
+
+def extract_links(base_url, html):
+    """Return the http(s) URLs linked to from 'html', made absolute
+    against 'base_url' and without fragments, in order of appearance."""
+    links = []
+    for match in _HREF.finditer(html):
+        href = (match.group(1) or match.group(2) or match.group(3) or '').strip()
+        if not href:
+            continue
+        url = urlparse.urldefrag(urlparse.urljoin(base_url, href))[0]
+        if url.split(':', 1)[0].lower() in ('http', 'https') and '\n' not in url:
+            links.append(url)
+    return links
+
+def same_hosts(roots):
+    """Return a follow predicate that stays on the hosts of 'roots'."""
+    hosts = set([urlparse.urlsplit(root)[1].lower() for root in roots])
+    def follow(url):
+        return urlparse.urlsplit(url)[1].lower() in hosts
+    return follow
+
+def crawl(roots, completion_service, frontier, downloader, submit=None,
+          follow=None, max_pages=100):
+    """Download 'roots' and the pages they link to, yielding each
+    completed download as it comes off 'completion_service'.
+
+    'downloader(url)' makes the task for a URL (like Downloader(url)),
+    and each one is passed to 'submit', which defaults to
+    completion_service.submit; a politeness.HostScheduler's submit can
+    be used instead.  Only links that 'follow(url)' accepts are crawled,
+    and a URL already in 'frontier' is never submitted again.  At most
+    'max_pages' downloads are submitted.
+    """
+    if submit is None:
+        submit = completion_service.submit
+    submitted = 0
+    outstanding = 0
+    for url in roots:
+        if submitted < max_pages and frontier.add(url):
+            submit(downloader(url))
+            submitted += 1
+            outstanding += 1
+    while outstanding > 0:
+        result = completion_service.take().get()
+        outstanding -= 1
+        yield result
+        if submitted >= max_pages or not result.result:
+            continue
+        for url in extract_links(result.url, result.result):
+            if submitted >= max_pages:
+                break
+            if (follow is None or follow(url)) and frontier.add(url):
+                submit(downloader(url))
+                submitted += 1
+                outstanding += 1
@@ -0,0 +1,187 @@
+"""A queue that spills overflow items to disk instead of keeping them in memory."""
+
+from __future__ import with_statement
+from collections import deque
+from batchqueue import BatchQueue
+import cPickle
+import os
+import struct
+import tempfile
+
+__all__ = ['SpillingQueue']
+
+try:
+    import mmap
+except ImportError:
+    # Jython has no mmap module, so map segments with NIO instead
+    mmap = None
+    import jarray
+    from java.io import RandomAccessFile
+    from java.nio.channels import FileChannel
+
+    class _MappedSegment(object):
+        def __init__(self, path):
+            f = RandomAccessFile(path, 'r')
+            try:
+                channel = f.getChannel()
+                # the mapping stays valid after the file is closed
+                self._buffer = channel.map(
+                    FileChannel.MapMode.READ_ONLY, 0, channel.size())
+            finally:
+                f.close()
+
+        def read(self, n):
+            data = jarray.zeros(n, 'b')
+            self._buffer.get(data)
+            return data.tostring()
+
+        def close(self):
+            # MappedByteBuffers are unmapped when they are collected
+            self._buffer = None
+
+def _map_segment(path):
+    if mmap is None:
+        return _MappedSegment(path)
+    f = open(path, 'rb')
+    try:
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    finally:
+        f.close()
+
+# Each record in a segment file is a 4-byte big-endian length followed
+# by that many bytes of pickled item.
+_HEADER = '>I'
+_HEADER_SIZE = struct.calcsize(_HEADER)
+
+class _Segment(object):
+    """An append-only file of records.
+
+    Records are appended until the segment is sealed; the first read
+    seals it and memory-maps the whole file, which is then read through
+    once, in order.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.unread = 0
+        self.size = 0
+        self._writer = open(path, 'wb')
+        self._reader = None
+
+    def sealed(self):
+        return self._writer is None
+
+    def seal(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    def append(self, data):
+        self._writer.write(struct.pack(_HEADER, len(data)))
+        self._writer.write(data)
+        self.unread += 1
+        self.size += _HEADER_SIZE + len(data)
+
+    def read(self):
+        if self._reader is None:
+            self.seal()
+            self._reader = _map_segment(self.path)
+        n, = struct.unpack(_HEADER, self._reader.read(_HEADER_SIZE))
+        self.unread -= 1
+        return self._reader.read(n)
+
+    def remove(self):
+        self.seal()
+        if self._reader is not None:
+            self._reader.close()
+            self._reader = None
+        os.remove(self.path)
+
+class SpillingQueue(BatchQueue):
+    """Variant of Queue that keeps at most 'memory_size' items in memory.
+
+    Only while the in-memory window is full are further items pickled
+    and appended to segment files of about 'segment_size' bytes in
+    'directory' (a new temporary directory by default).  Each get()
+    refills the window from the oldest segment, so segments are
+    memory-mapped and read back in order, and are deleted as soon as
+    they have been read; producers can run ahead of consumers without
+    growing the heap.
+
+    maxsize still bounds the total number of items, in memory or on
+    disk; if it is <= 0 the queue is only bounded by disk space.  Items
+    must be picklable.  Disk I/O happens while the queue's mutex is
+    held.  Call close() to delete any remaining segments.
+    """
+    def __init__(self, maxsize=0, memory_size=1000, directory=None,
+                 segment_size=4 * 1024 * 1024):
+        if memory_size < 0:
+            raise ValueError("'memory_size' must be a non-negative number")
+        self.memory_size = memory_size
+        self.segment_size = segment_size
+        self._owns_directory = directory is None
+        if directory is None:
+            directory = tempfile.mkdtemp(prefix='spillqueue-')
+        self.directory = directory
+        BatchQueue.__init__(self, maxsize)
+
+    def close(self):
+        """Discard any spilled items and delete their segment files."""
+        with self.mutex:
+            while self._segments:
+                self._segments.popleft().remove()
+            self._spilled = 0
+            if self._owns_directory and os.path.isdir(self.directory):
+                os.rmdir(self.directory)
+
+    def _init(self, maxsize):
+        self.maxsize = maxsize
+        # Invariant: while any items are spilled, the window is full and
+        # every item in memory was put before all of them, so FIFO order
+        # is preserved by reading memory first, then the segments in
+        # order.
+        self.queue = deque()
+        self._segments = deque()
+        self._spilled = 0
+        self._segment_number = 0
+
+    def _qsize(self):
+        return len(self.queue) + self._spilled
+
+    def _empty(self):
+        return not self.queue and not self._spilled
+
+    def _full(self):
+        return self.maxsize > 0 and self._qsize() >= self.maxsize
+
+    def _put(self, item):
+        if len(self.queue) < self.memory_size:
+            self.queue.append(item)
+            return
+        data = cPickle.dumps(item, cPickle.HIGHEST_PROTOCOL)
+        if not self._segments or self._segments[-1].sealed() or \
+                self._segments[-1].size >= self.segment_size:
+            if self._segments:
+                self._segments[-1].seal()
+            self._segment_number += 1
+            self._segments.append(_Segment(os.path.join(
+                self.directory, 'segment-%08d' % self._segment_number)))
+        self._segments[-1].append(data)
+        self._spilled += 1
+
+    def _get(self):
+        if not self.queue:
+            # only when memory_size is 0
+            return self._unspill()
+        item = self.queue.popleft()
+        while self._spilled and len(self.queue) < self.memory_size:
+            self.queue.append(self._unspill())
+        return item
+
+    def _unspill(self):
+        # Read back the oldest spilled item
+        segment = self._segments[0]
+        data = segment.read()
+        self._spilled -= 1
+        if not segment.unread:
+            self._segments.popleft().remove()
+        return cPickle.loads(data)
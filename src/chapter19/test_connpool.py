@@ -0,0 +1,79 @@
+from connpool import ConnectionPool
+from localserver import start_server
+import threading
+import time
+import unittest
+import urllib2
+
+class ConnectionPoolTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.server = start_server(body_size=10000)
+
+    def tearDown(self):
+        self.server.stop()
+
+    def fetch(self, pool, path='/'):
+        response = pool.urlopen(self.server.url(path))
+        try:
+            return response.read()
+        finally:
+            response.close()
+
+    def test_keep_alive(self):
+        pool = ConnectionPool()
+        for i in xrange(10):
+            self.assertEqual(len(self.fetch(pool, '/%d' % i)), 10000)
+        self.assertEqual(self.server.connections, 1)
+        pool.close()
+
+    def test_max_per_host(self):
+        pool = ConnectionPool(max_per_host=2)
+        def fetch_many():
+            for i in xrange(10):
+                self.fetch(pool)
+        threads = [threading.Thread(target=fetch_many) for i in xrange(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join(10)
+            self.assertFalse(t.isAlive())
+        self.assertTrue(self.server.connections <= 2)
+        pool.close()
+
+    def test_idle_timeout(self):
+        pool = ConnectionPool(idle_timeout=0.05)
+        self.fetch(pool)
+        time.sleep(0.1)
+        self.fetch(pool)
+        self.assertEqual(self.server.connections, 2)
+        pool.close()
+
+    def test_partial_read_is_not_reused(self):
+        pool = ConnectionPool()
+        response = pool.urlopen(self.server.url())
+        response.read(10)
+        response.close()
+        self.fetch(pool)
+        self.assertEqual(self.server.connections, 2)
+        pool.close()
+
+    def test_server_latency_and_errors(self):
+        self.server.stop()
+        self.server = start_server(latency=0.05, error_rate=1.0)
+        pool = ConnectionPool()
+        start = time.time()
+        for i in xrange(10):
+            try:
+                self.fetch(pool)
+            except urllib2.HTTPError, e:
+                self.assertEqual(e.code, 500)
+            else:
+                self.fail('expected a 500')
+        # ten exponentially distributed delays averaging 50ms each
+        self.assertTrue(time.time() - start > 0.05)
+        pool.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
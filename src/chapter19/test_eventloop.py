@@ -0,0 +1,92 @@
+from eventloop import DownloadLoop
+from localserver import LocalServer, _Handler
+import socket
+import threading
+import unittest
+import urllib2
+
+class Page(object):
+    # DownloadLoop fills in a Downloader's result attributes; a plain
+    # object with a url works the same way
+    def __init__(self, url):
+        self.url = url
+        self.result = None
+        self.bytes_read = 0
+        self.exception = None
+
+class Handler(_Handler):
+
+    def do_GET(self):
+        if self.path == '/chunked':
+            self.send_response(200)
+            self.send_header('Transfer-Encoding', 'chunked')
+            self.end_headers()
+            for chunk in ('hello', ' ', 'world'):
+                self.wfile.write('%x\r\n%s\r\n' % (len(chunk), chunk))
+            self.wfile.write('0\r\n\r\n')
+        elif self.path == '/redirect':
+            self.send_response(302)
+            self.send_header('Location', '/page')
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+        elif self.path == '/missing':
+            self.send_response(404)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+        else:
+            _Handler.do_GET(self)
+
+class DownloadLoopTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.server = LocalServer(body_size=10000, handler=Handler)
+        self.server.start()
+
+    def tearDown(self):
+        self.server.stop()
+
+    def test_many_on_one_thread(self):
+        pages = [Page(self.server.url('/page/%d' % i)) for i in xrange(200)]
+        DownloadLoop(max_in_flight=50).run(pages)
+        for page in pages:
+            self.assertEqual(page.exception, None)
+            self.assertEqual(page.bytes_read, 10000)
+            self.assertEqual(page.thread_used,
+                             threading.currentThread().getName())
+            self.assertTrue(page.started <= page.completed)
+        # kept-alive connections were reused
+        self.assertTrue(self.server.connections <= 50, self.server.connections)
+
+    def test_threads(self):
+        pages = [Page(self.server.url('/page/%d' % i)) for i in xrange(20)]
+        DownloadLoop(threads=2).run(pages)
+        self.assertEqual(len(set([page.thread_used for page in pages])), 2)
+        self.assertEqual([page.result for page in pages],
+                         [self.server.body] * 20)
+
+    def test_chunked_and_redirect(self):
+        chunked = Page(self.server.url('/chunked'))
+        redirect = Page(self.server.url('/redirect'))
+        DownloadLoop().run([chunked, redirect])
+        self.assertEqual(chunked.result, 'hello world')
+        self.assertEqual(redirect.result, self.server.body)
+
+    def test_errors(self):
+        s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        s.bind(('127.0.0.1', 0))
+        closed_port = s.getsockname()[1]
+        s.close()
+        missing = Page(self.server.url('/missing'))
+        refused = Page('http://127.0.0.1:%d/' % closed_port)
+        unsupported = Page('ftp://127.0.0.1/')
+        DownloadLoop().run([missing, refused, unsupported])
+        self.assertTrue(isinstance(missing.exception, urllib2.HTTPError))
+        self.assertEqual(missing.exception.code, 404)
+        self.assertTrue(isinstance(refused.exception, socket.error))
+        self.assertTrue(isinstance(unsupported.exception, ValueError))
+        for page in (missing, refused, unsupported):
+            self.assertTrue(page.completed is not None)
+
+
+if __name__ == '__main__':
+    unittest.main()
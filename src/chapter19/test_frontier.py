@@ -0,0 +1,99 @@
+from frontier import BloomFilter, Frontier
+from spider import extract_links, same_hosts
+import shutil
+import tempfile
+import unittest
+
+class BloomFilterTestCase(unittest.TestCase):
+
+    def test_no_false_negatives(self):
+        bloom = BloomFilter(1000)
+        for i in xrange(1000):
+            bloom.add('http://a/%d' % i)
+        for i in xrange(1000):
+            self.assertTrue('http://a/%d' % i in bloom)
+        self.assertFalse(bloom.add('http://a/0'))
+
+    def test_error_rate(self):
+        bloom = BloomFilter(1000, error_rate=0.01)
+        for i in xrange(1000):
+            bloom.add('http://a/%d' % i)
+        false_positives = len([i for i in xrange(10000)
+                               if 'http://b/%d' % i in bloom])
+        self.assertTrue(false_positives < 300, false_positives)
+
+class FrontierTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp(prefix='frontier-')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_add(self):
+        frontier = Frontier(self.directory, capacity=100)
+        self.assertTrue(frontier.add('http://a/'))
+        self.assertFalse(frontier.add('http://a/'))
+        self.assertTrue('http://a/' in frontier)
+        self.assertFalse('http://b/' in frontier)
+        self.assertEqual(len(frontier), 1)
+
+    def test_exact_despite_false_positives(self):
+        # a tiny filter says nearly everything is present, so every
+        # answer comes from the files
+        frontier = Frontier(self.directory, capacity=1, error_rate=0.5)
+        urls = ['http://a/%d' % i for i in xrange(200)]
+        self.assertEqual([frontier.add(url) for url in urls], [True] * 200)
+        self.assertEqual([frontier.add(url) for url in urls], [False] * 200)
+        self.assertEqual(len(frontier), 200)
+
+    def test_disk_reads_only_when_filter_matches(self):
+        frontier = Frontier(self.directory, capacity=10000)
+        for i in xrange(1000):
+            frontier.add('http://a/%d' % i)
+        self.assertTrue(frontier.disk_reads < 50, frontier.disk_reads)
+
+    def test_empty_buckets_are_not_read(self):
+        # many lookups pass the tiny filter, but only the one bucket
+        # with a file is read
+        frontier = Frontier(self.directory, capacity=1, error_rate=0.5)
+        frontier.add('http://a/')
+        urls = ['http://b/%d' % i for i in xrange(1000)]
+        self.assertEqual([url in frontier for url in urls], [False] * 1000)
+        bucket = frontier._bucket('http://a/')
+        passed = [url for url in urls if url in frontier.filter]
+        self.assertTrue(len(passed) > 100, len(passed))
+        self.assertEqual(frontier.disk_reads, len(
+            [url for url in passed if frontier._bucket(url) == bucket]))
+
+    def test_resume(self):
+        Frontier(self.directory).add('http://a/')
+        frontier = Frontier(self.directory)
+        self.assertEqual(len(frontier), 1)
+        self.assertFalse(frontier.add('http://a/'))
+
+class ExtractLinksTestCase(unittest.TestCase):
+
+    def test_extract_links(self):
+        html = '''<html><body>
+            <a href="/about">About</a>
+            <A HREF='news/today.html#top'>News</A>
+            <a class="x" href=http://other.com/>Other</a>
+            <a href="mailto:me@example.com">Mail</a>
+            <a href="#top">Top</a>
+            <a name="anchor">No link</a>
+            </body></html>'''
+        self.assertEqual(extract_links('http://example.com/dir/page.html', html),
+                         ['http://example.com/about',
+                          'http://example.com/dir/news/today.html',
+                          'http://other.com/',
+                          'http://example.com/dir/page.html'])
+
+    def test_same_hosts(self):
+        follow = same_hosts(['http://example.com/'])
+        self.assertTrue(follow('http://EXAMPLE.com/a'))
+        self.assertFalse(follow('http://other.com/'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+from connpool import ConnectionPool
+from fetcher import Fetcher
+from httpcache import HTTPCache
+from localserver import start_server
+import os
+import shutil
+import tempfile
+import unittest
+
+class HTTPCacheTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp(prefix='httpcache-')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_validators(self):
+        cache = HTTPCache(self.directory)
+        self.assertEqual(cache.validators('http://a/'), {})
+        cache.store('http://a/', 'body', '"1"', 'Mon, 01 Jan 2001 00:00:00 GMT')
+        self.assertEqual(cache.validators('http://a/'), {
+            'If-None-Match': '"1"',
+            'If-Modified-Since': 'Mon, 01 Jan 2001 00:00:00 GMT'})
+        self.assertEqual(cache.get('http://a/'), 'body')
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+    def test_without_validators_is_not_cached(self):
+        cache = HTTPCache(self.directory)
+        cache.store('http://a/', 'body')
+        self.assertEqual(cache.get('http://a/'), None)
+        self.assertEqual(os.listdir(self.directory), [])
+
+    def test_persistent(self):
+        HTTPCache(self.directory).store('http://a/', 'body', '"1"')
+        cache = HTTPCache(self.directory)
+        self.assertEqual(cache.validators('http://a/'), {'If-None-Match': '"1"'})
+        self.assertEqual(cache.get('http://a/'), 'body')
+
+    def test_lru_eviction(self):
+        cache = HTTPCache(self.directory, max_bytes=25)
+        for name in 'abc':
+            cache.store('http://%s/' % name, 'x' * 10, '"%s"' % name)
+            cache.get('http://a/') # keep a recently used
+        self.assertEqual(cache.evictions, 1)
+        self.assertEqual(cache.get('http://b/'), None)
+        self.assertEqual(cache.get('http://a/'), 'x' * 10)
+        self.assertEqual(cache.get('http://c/'), 'x' * 10)
+        self.assertEqual(len(os.listdir(self.directory)), 4)
+
+class ConditionalGetTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp(prefix='httpcache-')
+        self.server = start_server(body_size=1000)
+        self.pool = ConnectionPool()
+
+    def tearDown(self):
+        self.pool.close()
+        self.server.stop()
+        shutil.rmtree(self.directory)
+
+    def test_not_modified_reuses_connection(self):
+        cache = HTTPCache(self.directory)
+        url = self.server.url('/page')
+        for i in xrange(5):
+            fetcher = Fetcher(url, pool=self.pool, cache=cache)
+            fetcher.call()
+            self.assertEqual(fetcher.exception, None)
+            self.assertEqual(fetcher.result, 'x' * 1000)
+            self.assertEqual(fetcher.cached, i > 0)
+        self.assertEqual(self.server.connections, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+from importprofile import ImportProfiler
+import __builtin__
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+MODULES = {
+    'profile_outer': 'import time\ntime.sleep(0.02)\nimport profile_inner\n',
+    'profile_inner': 'import time\ntime.sleep(0.05)\n',
+}
+
+class ImportProfilerTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp(prefix='importprofile-')
+        sys.path.insert(0, self.directory)
+        for name, source in MODULES.items():
+            f = open(os.path.join(self.directory, name + '.py'), 'w')
+            f.write(source)
+            f.close()
+
+    def tearDown(self):
+        sys.path.remove(self.directory)
+        shutil.rmtree(self.directory)
+        for name in MODULES:
+            sys.modules.pop(name, None)
+
+    def profile(self):
+        import_ = __builtin__.__import__
+        profiler = ImportProfiler().install()
+        try:
+            __import__('profile_outer')
+            __import__('profile_outer') # already loaded, not recorded again
+        finally:
+            profiler.uninstall()
+        self.assertTrue(__builtin__.__import__ is import_)
+        return profiler
+
+    def test_nesting_and_self_time(self):
+        records = dict([(path, (total, self_time))
+                        for path, total, self_time in self.profile().records])
+        self.assertEqual(sorted(records), [('profile_outer',),
+                                           ('profile_outer', 'profile_inner')])
+        outer_total, outer_self = records[('profile_outer',)]
+        inner_total, inner_self = records[('profile_outer', 'profile_inner')]
+        self.assertTrue(inner_total >= 0.05)
+        self.assertTrue(outer_total >= inner_total + 0.02)
+        self.assertAlmostEqual(outer_self, outer_total - inner_total, 6)
+        self.assertTrue(outer_self < inner_self)
+
+    def test_folded(self):
+        lines = self.profile().folded()
+        self.assertEqual([line.split()[0] for line in lines],
+                         ['profile_outer', 'profile_outer;profile_inner'])
+        self.assertTrue(int(lines[1].split()[1]) >= 50000)
+
+    def test_report(self):
+        lines = self.profile().report().splitlines()
+        self.assertEqual(len(lines), 3)
+        self.assertTrue(lines[1].endswith('  profile_outer'))
+        self.assertTrue(lines[2].endswith('    profile_inner'))
+
+    def test_report_by_self_time(self):
+        profiler = self.profile()
+        lines = profiler.report(sort='self').splitlines()
+        self.assertEqual(len(lines), 3)
+        self.assertTrue(lines[1].endswith('  profile_outer > profile_inner'))
+        self.assertTrue(lines[2].endswith('  profile_outer'))
+        self.assertRaises(ValueError, profiler.report, sort='name')
+
+
+if __name__ == '__main__':
+    unittest.main()
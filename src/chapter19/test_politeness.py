@@ -0,0 +1,99 @@
+from politeness import HostScheduler, TokenBucket
+import time
+import unittest
+
+class FakeCompletionService(object):
+    # keeps the submitted tasks for the test to run
+    def __init__(self):
+        self.tasks = []
+
+    def submit(self, task):
+        self.tasks.append(task)
+
+    def run(self, i=0):
+        return self.tasks.pop(i).call()
+
+class FakeDownloader(object):
+    def __init__(self, url, fail=False):
+        self.url = url
+        self.fail = fail
+
+    def call(self):
+        if self.fail:
+            raise IOError('failed')
+        return self
+
+def hosts(tasks):
+    return sorted([task.host for task in tasks])
+
+class TokenBucketTestCase(unittest.TestCase):
+
+    def test_burst(self):
+        bucket = TokenBucket(rate=10, burst=3)
+        for i in xrange(3):
+            self.assertEqual(bucket.take(), 0.0)
+        wait = bucket.take()
+        self.assertTrue(0 < wait <= 0.1, wait)
+
+class HostSchedulerTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.service = FakeCompletionService()
+        self.schedulers = []
+
+    def tearDown(self):
+        for scheduler in self.schedulers:
+            scheduler.shutdown()
+
+    def scheduler(self, **kwargs):
+        scheduler = HostScheduler(self.service, **kwargs)
+        self.schedulers.append(scheduler)
+        return scheduler
+
+    def test_per_host_cap(self):
+        scheduler = self.scheduler(max_per_host=2)
+        for i in xrange(5):
+            scheduler.submit(FakeDownloader('http://a/%d' % i))
+        scheduler.submit(FakeDownloader('http://B/'))
+        self.assertEqual(hosts(self.service.tasks), ['a', 'a', 'b'])
+        self.assertEqual(scheduler.pending(), 3)
+
+    def test_done_releases_slot(self):
+        scheduler = self.scheduler(max_per_host=1)
+        first = FakeDownloader('http://a/1')
+        second = FakeDownloader('http://a/2')
+        scheduler.submit(first)
+        scheduler.submit(second)
+        self.assertEqual(scheduler.pending(), 1)
+        self.assertTrue(self.service.run() is first)
+        self.assertEqual(scheduler.pending(), 0)
+        self.assertEqual([task.downloader for task in self.service.tasks],
+                         [second])
+
+    def test_failure_releases_slot(self):
+        scheduler = self.scheduler(max_per_host=1)
+        scheduler.submit(FakeDownloader('http://a/1', fail=True))
+        scheduler.submit(FakeDownloader('http://a/2'))
+        self.assertRaises(IOError, self.service.run)
+        self.assertEqual(scheduler.pending(), 0)
+        self.assertEqual(len(self.service.tasks), 1)
+
+    def test_rate_limit_defers(self):
+        scheduler = self.scheduler(max_per_host=10, rate=10, burst=1)
+        start = time.time()
+        for i in xrange(3):
+            scheduler.submit(FakeDownloader('http://a/%d' % i))
+        scheduler.submit(FakeDownloader('http://b/'))
+        # the first per host goes at once, the rest wait for the timer
+        self.assertEqual(hosts(self.service.tasks), ['a', 'b'])
+        self.assertEqual(scheduler.pending(), 2)
+        while scheduler.pending() and time.time() - start < 5:
+            time.sleep(0.01)
+        self.assertEqual(scheduler.pending(), 0)
+        self.assertEqual(hosts(self.service.tasks), ['a', 'a', 'a', 'b'])
+        # two more tokens at 10 per second take at least 0.2 seconds
+        self.assertTrue(time.time() - start >= 0.15)
+
+
+if __name__ == '__main__':
+    unittest.main()
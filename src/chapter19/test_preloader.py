@@ -0,0 +1,115 @@
+from preloader import Preloader, preload, read_modules, record
+import __builtin__
+import atexit
+import os
+import preloader as preloader_module
+import shutil
+import sys
+import tempfile
+import time
+import unittest
+
+SLOW_MODULE = '''
+import sys, time
+time.sleep(0.2)
+sys.preloader_test_runs = getattr(sys, 'preloader_test_runs', 0) + 1
+'''
+
+EXIT_MODULE = '''
+import time
+time.sleep(0.2)
+raise SystemExit('preload_exit')
+'''
+
+MODULES = {'preload_slow': SLOW_MODULE, 'preload_exit': EXIT_MODULE,
+           'preload_a': '', 'preload_b': ''}
+
+class PreloaderTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp(prefix='preloader-')
+        sys.path.insert(0, self.directory)
+        for name, source in MODULES.items():
+            f = open(os.path.join(self.directory, name + '.py'), 'w')
+            f.write(source)
+            f.close()
+        self.import_ = __builtin__.__import__
+        sys.preloader_test_runs = 0
+
+    def tearDown(self):
+        sys.path.remove(self.directory)
+        shutil.rmtree(self.directory)
+        for name in MODULES:
+            sys.modules.pop(name, None)
+
+    def test_preload(self):
+        preloader = Preloader(['preload_a', 'preload_b', 'no_such_module'])
+        preloader.start()
+        preloader.join(5)
+        self.assertTrue(preloader.done())
+        self.assertTrue('preload_a' in sys.modules)
+        self.assertTrue('preload_b' in sys.modules)
+        self.assertEqual(sorted(preloader.imported), ['preload_a', 'preload_b'])
+        self.assertTrue(isinstance(preloader.errors['no_such_module'],
+                                   ImportError))
+        # the import hook is removed once preloading is done
+        self.assertTrue(__builtin__.__import__ is self.import_)
+
+    def test_import_joins_preload(self):
+        preloader = Preloader(['preload_slow']).start()
+        time.sleep(0.05) # let the worker start the import
+        start = time.time()
+        import preload_slow
+        self.assertTrue(time.time() - start > 0.1)
+        self.assertEqual(sys.preloader_test_runs, 1)
+        preloader.join(5)
+        self.assertEqual(sys.preloader_test_runs, 1)
+
+    def test_concurrent_failures(self):
+        preloader = Preloader(['preload_exit', 'preload_slow', 'preload_a',
+                               'no_such_module'], threads=3).start()
+        time.sleep(0.05) # let the workers start their imports
+        # waits for the worker's failed import, then fails itself
+        self.assertRaises(SystemExit, __import__, 'preload_exit')
+        __import__('preload_slow')
+        preloader.join(5)
+        self.assertTrue(preloader.done())
+        self.assertEqual(sorted(preloader.imported), ['preload_a', 'preload_slow'])
+        self.assertEqual(sorted(preloader.errors), ['no_such_module', 'preload_exit'])
+        self.assertTrue(isinstance(preloader.errors['preload_exit'], SystemExit))
+        self.assertEqual(sys.preloader_test_runs, 1)
+        self.assertTrue(__builtin__.__import__ is self.import_)
+
+    def test_record_and_read(self):
+        path = os.path.join(self.directory, 'modules.txt')
+        f = open(path, 'w')
+        f.write('# recorded modules\npreload_a\n\npreload_b\n')
+        f.close()
+        self.assertEqual(read_modules(path), ['preload_a', 'preload_b'])
+        preloader = preload(['preload_b'], path=path)
+        preloader.join(5)
+        self.assertEqual(preloader.modules, ['preload_b', 'preload_a'])
+        # a missing list is the same as an empty one
+        preload(path=os.path.join(self.directory, 'missing.txt')).join(5)
+
+    def test_record(self):
+        path = os.path.join(self.directory, 'modules.txt')
+        writers = []
+        class FakeAtexit(object):
+            register = staticmethod(writers.append)
+        preloader_module.atexit = FakeAtexit
+        try:
+            record(path)
+        finally:
+            preloader_module.atexit = atexit
+        import preload_a
+        self.assertEqual(len(writers), 1)
+        writers[0]()
+        modules = read_modules(path)
+        self.assertTrue('preload_a' in modules)
+        self.assertFalse('preload_b' in modules)
+        self.assertFalse('os' in modules)
+
+
+if __name__ == '__main__':
+    unittest.main()
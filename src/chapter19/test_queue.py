@@ -1,9 +1,16 @@
 # Some simple Queue module tests, plus some failure conditions
 # to ensure the Queue locks remain stable.
 import Queue
+import batchqueue
+import orderedqueue
+import os
+import queuestats
+import ringqueue
+import spillqueue
 import sys
 import threading
 import time
+import twolockqueue
 
 # test.test_support is very picky on who runs it, so pull in necessary definitions here
 #from test.test_support import verify, TestFailed, verbose
@@ -97,21 +104,26 @@ def _doExceptionalBlockingTest(block_func, block_args, trigger_func,
 class FailingQueueException(Exception):
     pass
 
-class FailingQueue(Queue.Queue):
-    def __init__(self, *args):
-        self.fail_next_put = False
-        self.fail_next_get = False
-        Queue.Queue.__init__(self, *args)
-    def _put(self, item):
-        if self.fail_next_put:
+def make_failing_queue(base):
+    class FailingQueue(base):
+        def __init__(self, *args):
             self.fail_next_put = False
-            raise FailingQueueException, "You Lose"
-        return Queue.Queue._put(self, item)
-    def _get(self):
-        if self.fail_next_get:
             self.fail_next_get = False
-            raise FailingQueueException, "You Lose"
-        return Queue.Queue._get(self)
+            base.__init__(self, *args)
+        def _put(self, item):
+            if self.fail_next_put:
+                self.fail_next_put = False
+                raise FailingQueueException, "You Lose"
+            return base._put(self, item)
+        def _get(self):
+            if self.fail_next_get:
+                self.fail_next_get = False
+                raise FailingQueueException, "You Lose"
+            return base._get(self)
+    return FailingQueue
+
+FailingQueue = make_failing_queue(Queue.Queue)
+FailingTwoLockQueue = make_failing_queue(twolockqueue.TwoLockQueue)
 
 def FailingQueueTest(q):
     if not q.empty():
@@ -277,6 +289,170 @@ def QueueTaskDoneTest(q):
     else:
         raise TestFailed("Did not detect task count going negative")
 
+def BatchQueueTest(q):
+    if not q.empty():
+        raise RuntimeError, "Call this function with an empty queue"
+    q.put_many([111, 222])
+    verify(q.get_many() == [111, 222],
+           "Didn't seem to queue the correct data in a batch!")
+    q.task_done(2)
+    q.put_many(range(QUEUE_SIZE))
+    verify(q.full(), "Queue should be full")
+    try:
+        q.put_many(["full"], block=0)
+        raise TestFailed("Didn't appear to block with a full queue")
+    except Queue.Full:
+        pass
+    try:
+        q.put_many(["full"], timeout=0.01)
+        raise TestFailed("Didn't appear to time-out with a full queue")
+    except Queue.Full:
+        pass
+    verify(q.get_many(2) == [0, 1], "Didn't respect max_items")
+    # a non-blocking batch is all or nothing
+    try:
+        q.put_many(["a", "b", "c"], block=0)
+        raise TestFailed("Didn't refuse a batch larger than the free slots")
+    except Queue.Full:
+        pass
+    verify(q.qsize() == QUEUE_SIZE - 2, "Partial batch was enqueued")
+    # Test a blocking put of a batch larger than the free slots
+    _doBlockingTest(q.put_many, (["x", "y", "z"],), q.get_many, (2,))
+    verify(q.get_many() == [4, "x", "y", "z"], "Batch put out of order")
+    verify(q.empty(), "Queue should be empty")
+    try:
+        q.get_many(block=0)
+        raise TestFailed("Didn't appear to block with an empty queue")
+    except Queue.Empty:
+        pass
+    try:
+        q.get_many(timeout=0.01)
+        raise TestFailed("Didn't appear to time-out with an empty queue")
+    except Queue.Empty:
+        pass
+    # Test a blocking get of a batch
+    verify(_doBlockingTest(q.get_many, (), q.put_many, (["empty"],)) ==
+           ["empty"], "Blocking get_many returned the wrong batch")
+    q.task_done(QUEUE_SIZE + 4)
+    try:
+        q.task_done(1)
+    except ValueError:
+        pass
+    else:
+        raise TestFailed("Did not detect task count going negative")
+
+def batch_worker(q):
+    global cum
+    while True:
+        batch = q.get_many(10)
+        total = sum([x for x in batch if x is not None])
+        cumlock.acquire()
+        try:
+            cum += total
+        finally:
+            cumlock.release()
+        if None in batch:
+            # leave any other sentinels in this batch for the other workers
+            q.put_many([None] * (batch.count(None) - 1))
+            q.task_done(len(batch))
+            return
+        q.task_done(len(batch))
+
+def QueueBatchJoinTest(q):
+    global cum
+    cum = 0
+    threads = [threading.Thread(target=batch_worker, args=(q,))
+               for i in (0,1)]
+    for t in threads:
+        t.start()
+    q.put_many(xrange(100))
+    q.join()
+    verify(cum==sum(range(100)), "q.join() did not block until all batches were done")
+    q.put_many([None, None])   # instruct the threads to close
+    for t in threads:
+        t.join(10)
+    q.join()
+
+def OrderedQueueTest():
+    q = orderedqueue.PriorityQueue()
+    q.put_many([(3, "c"), (1, "a"), (4, "d"), (2, "b")])
+    verify([q.get() for i in range(4)] == [(1, "a"), (2, "b"), (3, "c"), (4, "d")],
+           "PriorityQueue didn't return the lowest entry first")
+    q = orderedqueue.LifoQueue(QUEUE_SIZE)
+    q.put_many(range(QUEUE_SIZE))
+    verify(q.full(), "Queue should be full")
+    verify(q.get_many() == range(QUEUE_SIZE - 1, -1, -1),
+           "LifoQueue didn't return the newest entry first")
+
+def DelayQueueTest(q):
+    if not q.empty():
+        raise RuntimeError, "Call this function with an empty queue"
+    now = time.time()
+    q.put((now + 1, "later"))
+    q.put((now - 1, "expired"))
+    verify(q.get_many(block=0) == [(now - 1, "expired")],
+           "Didn't return only the expired entry")
+    try:
+        q.get(block=0)
+        raise TestFailed("Returned an entry before its deadline")
+    except Queue.Empty:
+        pass
+    try:
+        q.get(timeout=0.01)
+        raise TestFailed("Didn't appear to time-out before the deadline")
+    except Queue.Empty:
+        pass
+    # putting an earlier deadline must wake up a waiting get()
+    soon = (time.time() + 0.01, "soon")
+    verify(_doBlockingTest(q.get, (True, 10), q.put, (soon,)) == soon,
+           "Didn't return the entry with the earliest deadline")
+    # and get() itself wakes up at the deadline
+    start = time.time()
+    q.put((start + 0.2, "deadline"))
+    verify(q.get()[1] == "deadline" and time.time() >= start + 0.2,
+           "Returned an entry before its deadline")
+    verify(q.qsize() == 1, "Queue should hold the later entry")
+    verify(q.get()[1] == "later", "Didn't return the last entry")
+    verify(q.empty(), "Queue should be empty")
+
+def SpillingQueueTest():
+    q = spillqueue.SpillingQueue(memory_size=3, segment_size=64)
+    q.put_many(range(100))
+    verify(len(q.queue) == 3, "Queue kept more than memory_size items in memory")
+    verify(len(os.listdir(q.directory)) > 1, "Queue didn't spill to several segments")
+    verify(q.get_many(50) == range(50), "Spilled items came back out of order")
+    verify(len(q.queue) == 3, "Queue didn't refill memory from disk")
+    q.put_many(range(100, 110))
+    verify(q.get_many(58) == range(50, 108), "Spilled items came back out of order")
+    verify(os.listdir(q.directory) == [], "Consumed segments weren't reclaimed")
+    q.put("memory")
+    verify(list(q.queue) == [108, 109, "memory"],
+           "Queue spilled while memory had room")
+    verify(q.get_many() == [108, 109, "memory"], "Queue lost in-memory items")
+    q.close()
+    verify(not os.path.exists(q.directory), "close() didn't remove the directory")
+    q = spillqueue.SpillingQueue(memory_size=0)
+    q.put_many(range(5))
+    verify(q.get_many() == range(5), "Queue without memory lost spilled items")
+    q.close()
+
+def QueueStatsTest(q):
+    stats = queuestats.instrument(q)
+    SimpleQueueTest(q)
+    snapshot = stats.snapshot()
+    verify(snapshot['enqueued'] == snapshot['dequeued'] == QUEUE_SIZE + 6,
+           "Didn't count every put and get")
+    verify(snapshot['depth'] == 0, "Queue should be empty")
+    verify(snapshot['high_water'] == QUEUE_SIZE, "Wrong high-water mark")
+    # SimpleQueueTest blocks twice on a full and twice on an empty queue
+    verify(snapshot['put_waits'] >= 2 and snapshot['put_wait_time'] > 0,
+           "Didn't record producer waits")
+    verify(snapshot['get_waits'] >= 2 and snapshot['get_wait_time'] > 0,
+           "Didn't record consumer waits")
+    verify(snapshot['latency_count'] == snapshot['dequeued'] and
+           sum(snapshot['latency_histogram']) == snapshot['latency_count'],
+           "Didn't record put-to-get latency for every item")
+
 def test():
     q = Queue.Queue()
     QueueTaskDoneTest(q)
@@ -290,11 +466,98 @@ def test():
     SimpleQueueTest(q)
     if verbose:
         print "Simple Queue tests seemed to work"
+    q = batchqueue.BatchQueue(QUEUE_SIZE)
+    BatchQueueTest(q)
+    BatchQueueTest(q)
+    QueueBatchJoinTest(batchqueue.BatchQueue())
+    if verbose:
+        print "Batch Queue tests seemed to work"
+    OrderedQueueTest()
+    q = orderedqueue.DelayQueue()
+    DelayQueueTest(q)
+    DelayQueueTest(q)
+    if verbose:
+        print "Priority, Lifo and Delay Queue tests seemed to work"
+    q = ringqueue.RingQueue(QUEUE_SIZE)
+    SimpleQueueTest(q)
+    SimpleQueueTest(q)
+    q = ringqueue.RingQueue(QUEUE_SIZE)
+    BatchQueueTest(q)
+    BatchQueueTest(q)
+    QueueJoinTest(ringqueue.RingQueue(QUEUE_SIZE))
+    if verbose:
+        print "Ring Queue tests seemed to work"
+    q = spillqueue.SpillingQueue(QUEUE_SIZE, memory_size=2)
+    SimpleQueueTest(q)
+    SimpleQueueTest(q)
+    q.close()
+    q = spillqueue.SpillingQueue(memory_size=2)
+    QueueJoinTest(q)
+    q.close()
+    SpillingQueueTest()
+    if verbose:
+        print "Spilling Queue tests seemed to work"
+    QueueStatsTest(Queue.Queue(QUEUE_SIZE))
+    QueueStatsTest(twolockqueue.TwoLockQueue(QUEUE_SIZE))
+    q = FailingQueue(QUEUE_SIZE)
+    queuestats.instrument(q)
+    FailingQueueTest(q)
+    verify(q.stats.snapshot()['depth'] == 0, "Counted a failed put or get")
+    if queuestats.DynamicMBean is None:
+        # warns, and registers nothing
+        verify(queuestats.register_mbean(q.stats, 'test:type=Queue') is None,
+               "Registered an MBean without JMX")
+    if verbose:
+        print "Queue stats tests seemed to work"
     q = FailingQueue(QUEUE_SIZE)
     FailingQueueTest(q)
     FailingQueueTest(q)
     if verbose:
         print "Failing Queue tests seemed to work"
 
+    q = twolockqueue.TwoLockQueue()
+    QueueTaskDoneTest(q)
+    QueueJoinTest(q)
+    QueueJoinTest(q)
+    QueueTaskDoneTest(q)
+    QueueBatchJoinTest(q)
+    q = twolockqueue.TwoLockQueue(QUEUE_SIZE)
+    SimpleQueueTest(q)
+    SimpleQueueTest(q)
+    q = twolockqueue.TwoLockQueue(QUEUE_SIZE)
+    BatchQueueTest(q)
+    BatchQueueTest(q)
+    q = FailingTwoLockQueue(QUEUE_SIZE)
+    FailingQueueTest(q)
+    FailingQueueTest(q)
+    if verbose:
+        print "Two-lock Queue tests seemed to work"
+
+def benchmark(args):
+    # Queue throughput and latency, for every queue organization,
+    # instead of the correctness tests
+    from optparse import OptionParser
+    import bench_queue
+    parser = OptionParser(usage="%prog --benchmark [options]")
+    parser.add_option('--benchmark', action='store_true')
+    parser.add_option('-o', '--output', dest='output', default=None,
+                      help="Write the results to this file as CSV")
+    parser.add_option('-n', '--items', dest='items', type='int', default=100000,
+                      help="Items to move per configuration")
+    parser.add_option('-q', '--queue', dest='queues', action='append',
+                      help="Queue class to benchmark (repeatable); default all")
+    options, args = parser.parse_args(args)
+    queues = {'Queue': Queue.Queue, 'RingQueue': ringqueue.RingQueue,
+              'TwoLockQueue': twolockqueue.TwoLockQueue,
+              'PriorityQueue': orderedqueue.PriorityQueue,
+              'LifoQueue': orderedqueue.LifoQueue}
+    names = options.queues or ['Queue', 'RingQueue', 'TwoLockQueue',
+                               'PriorityQueue', 'LifoQueue']
+    bench_queue.handoff_suite([queues[name] for name in names],
+                              items=options.items, output=options.output)
+
 if __name__ == '__main__':
-    test()
+    if '--benchmark' in sys.argv[1:]:
+        benchmark(sys.argv[1:])
+    else:
+        test()
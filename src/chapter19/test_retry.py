@@ -0,0 +1,141 @@
+from fetcher import Fetcher
+from httpcache import HTTPCache
+from retry import Hedge, backoff, is_transient
+import shutil
+import socket
+import tempfile
+import threading
+import time
+import unittest
+import urllib2
+
+class RetryTestCase(unittest.TestCase):
+
+    def test_is_transient(self):
+        self.assertTrue(is_transient(socket.timeout('timed out')))
+        self.assertTrue(is_transient(socket.error(104, 'reset')))
+        self.assertTrue(is_transient(urllib2.HTTPError('u', 503, '', {}, None)))
+        self.assertFalse(is_transient(urllib2.HTTPError('u', 404, '', {}, None)))
+        self.assertFalse(is_transient(ValueError()))
+
+    def test_backoff(self):
+        for attempt in xrange(10):
+            delay = backoff(attempt, base=0.1, maximum=1.0)
+            self.assertTrue(0 <= delay <= min(1.0, 0.1 * 2 ** attempt))
+
+class HedgeTestCase(unittest.TestCase):
+
+    def warm(self, hedge, seconds=0.01):
+        for i in xrange(hedge.min_samples):
+            hedge.record(seconds)
+
+    def test_no_hedging_until_min_samples(self):
+        hedge = Hedge(min_samples=5)
+        self.assertEqual(hedge.delay(), None)
+        self.assertEqual(hedge.call(lambda: 42), 42)
+        self.warm(hedge)
+        self.assertEqual(hedge.delay(), 0.01)
+
+    def test_percentile_window(self):
+        hedge = Hedge(percentile=50, min_samples=1, window=10)
+        for i in xrange(20):
+            hedge.record(i)
+        self.assertEqual(hedge.delay(), 15)
+
+    def test_hedged_request_wins(self):
+        hedge = Hedge(min_samples=5)
+        self.warm(hedge)
+        calls = []
+        lock = threading.Lock()
+        def slow_then_fast():
+            lock.acquire()
+            try:
+                calls.append(1)
+                first = len(calls) == 1
+            finally:
+                lock.release()
+            if first:
+                time.sleep(1)
+                return 'slow'
+            return 'fast'
+        start = time.time()
+        self.assertEqual(hedge.call(slow_then_fast), 'fast')
+        self.assertTrue(time.time() - start < 0.5)
+        self.assertEqual((hedge.hedged, hedge.won), (1, 1))
+
+    def test_fast_request_is_not_hedged(self):
+        hedge = Hedge(min_samples=5)
+        self.warm(hedge, 1.0)
+        self.assertEqual(hedge.call(lambda: 'ok'), 'ok')
+        self.assertEqual(hedge.hedged, 0)
+
+    def test_both_fail(self):
+        hedge = Hedge(min_samples=5)
+        self.warm(hedge)
+        def fail():
+            time.sleep(0.05)
+            raise socket.timeout('timed out')
+        self.assertRaises(socket.timeout, hedge.call, fail)
+        self.assertEqual((hedge.hedged, hedge.won), (1, 0))
+
+class FakeResponse(object):
+    status = 200
+
+    def __init__(self, body):
+        self.body = body
+
+    def getheader(self, name, default=None):
+        return {'etag': '"1"'}.get(name, default)
+
+    def read(self):
+        return self.body
+
+    def close(self):
+        pass
+
+class SlowFirstPool(object):
+    # the first request takes 'delay' seconds, later ones answer at once
+    def __init__(self, delay):
+        self.delay = delay
+        self.requests = 0
+        self.lock = threading.Lock()
+
+    def urlopen(self, url, headers=None):
+        self.lock.acquire()
+        try:
+            self.requests += 1
+            first = self.requests == 1
+        finally:
+            self.lock.release()
+        if first:
+            time.sleep(self.delay)
+        return FakeResponse('body')
+
+class HedgedDownloaderTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp(prefix='retry-')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_hedged_fetch_is_cached_once(self):
+        hedge = Hedge(min_samples=5)
+        for i in xrange(hedge.min_samples):
+            hedge.record(0.01)
+        cache = HTTPCache(self.directory)
+        downloader = Fetcher('http://a/', pool=SlowFirstPool(0.5),
+                             cache=cache, hedge=hedge)
+        downloader.call()
+        self.assertEqual(downloader.exception, None)
+        self.assertEqual(downloader.result, 'body')
+        self.assertEqual(downloader.cached, False)
+        self.assertEqual(hedge.won, 1)
+        time.sleep(0.7) # let the slow request finish too
+        self.assertEqual(cache.misses, 1)
+        self.assertEqual(downloader.cached, False)
+        self.assertEqual(cache.get('http://a/'), 'body')
+
+
+if __name__ == '__main__':
+    unittest.main()
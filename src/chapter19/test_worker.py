@@ -0,0 +1,120 @@
+from __future__ import with_statement
+from worker import WorkQueue, CancelledError, TimeoutError
+import threading
+import time
+import unittest
+
+class WorkQueueTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.pool = WorkQueue(4)
+
+    def tearDown(self):
+        self.pool.shutdown()
+
+    def test_submit(self):
+        futures = [self.pool.submit(pow, 2, i) for i in xrange(20)]
+        self.assertEqual([f.result(5) for f in futures],
+                         [2 ** i for i in xrange(20)])
+        self.assertTrue(futures[0].done())
+
+    def test_exception_propagates(self):
+        future = self.pool.submit(int, "not a number")
+        self.assertRaises(ValueError, future.result, 5)
+        self.assertTrue(isinstance(future.exception(), ValueError))
+
+    def test_timeout(self):
+        event = threading.Event()
+        future = self.pool.submit(event.wait)
+        self.assertRaises(TimeoutError, future.result, 0.01)
+        event.set()
+        future.result(5)
+
+    def test_cancel(self):
+        # keep every worker busy so the last task is still queued
+        event = threading.Event()
+        for i in xrange(4):
+            self.pool.submit(event.wait)
+        future = self.pool.submit(pow, 2, 2)
+        self.assertTrue(future.cancel())
+        event.set()
+        self.assertRaises(CancelledError, future.result, 5)
+
+    def test_map_chunksize(self):
+        for chunksize in (1, 7, 1000):
+            self.assertEqual(
+                list(self.pool.map(lambda x, y: x * y, xrange(100), xrange(100),
+                                   chunksize=chunksize)),
+                [x * x for x in xrange(100)])
+
+    def test_map_exception(self):
+        results = self.pool.map(lambda x: 1 / x, [1, 1, 0, 2], chunksize=2)
+        self.assertEqual([results.next(), results.next()], [1, 1])
+        self.assertRaises(ZeroDivisionError, results.next)
+
+    def test_elastic_grow_and_retire(self):
+        pool = WorkQueue(1, max_worker_threads=4, keepalive=0.1)
+        event = threading.Event()
+        futures = [pool.submit(event.wait, 5) for i in xrange(8)]
+        stats = pool.stats()
+        self.assertEqual(stats['workers'], 4)
+        self.assertEqual(stats['peak_workers'], 4)
+        self.assertTrue(stats['grown_for_backlog'] >= 1)
+        event.set()
+        for future in futures:
+            future.result(5)
+        time.sleep(0.5) # idle for longer than keepalive
+        stats = pool.stats()
+        self.assertEqual(stats['workers'], 1)
+        self.assertEqual(stats['workers_retired'], 3)
+        pool.shutdown()
+
+    def test_elastic_grow_on_wait(self):
+        pool = WorkQueue(1, max_worker_threads=2, backlog_threshold=100,
+                         wait_threshold=0.05)
+        futures = [pool.submit(time.sleep, 0.1) for i in xrange(3)]
+        for future in futures:
+            future.result(5)
+        self.assertEqual(pool.stats()['grown_for_wait'], 1)
+        pool.shutdown()
+        for t in pool._threads:
+            self.assertFalse(t.isAlive())
+
+    def test_work_stealing(self):
+        for workers in (1, 4):
+            pool = WorkQueue(workers, work_stealing=True)
+            threads_used = set()
+            def psum(lo, hi):
+                threads_used.add(threading.currentThread().getName())
+                if hi - lo <= 8:
+                    time.sleep(0.001)
+                    return sum(xrange(lo, hi))
+                mid = (lo + hi) // 2
+                left = pool.submit(psum, lo, mid)
+                return psum(mid, hi) + left.result()
+            # with one worker, this only finishes because a worker waiting
+            # on a subtask runs it itself
+            self.assertEqual(pool.submit(psum, 0, 2000).result(10),
+                             sum(xrange(2000)))
+            # idle workers stole subtasks from the busy ones
+            self.assertEqual(len(threads_used), workers)
+            pool.shutdown()
+
+    def test_shutdown_wakes_idle_workers(self):
+        pool = WorkQueue(3)
+        time.sleep(0.05) # let the workers block on the empty queue
+        pool.shutdown()
+        for t in pool._threads:
+            self.assertFalse(t.isAlive())
+        self.assertRaises(RuntimeError, pool.submit, pow, 2, 2)
+
+    def test_shutdown_runs_pending_tasks(self):
+        pool = WorkQueue(1)
+        futures = [pool.submit(time.sleep, 0.01) for i in xrange(5)]
+        pool.shutdown()
+        for future in futures:
+            self.assertTrue(future.done())
+
+
+if __name__ == '__main__':
+    unittest.main()
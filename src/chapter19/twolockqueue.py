@@ -0,0 +1,212 @@
+"""A queue whose producers and consumers take separate locks."""
+
+from __future__ import with_statement
+from time import time as _time
+from Queue import Empty, Full
+from batchqueue import BatchQueue, _endtime
+
+__all__ = ['TwoLockQueue']
+
+try:
+    from java.util.concurrent.atomic import AtomicLong as _AtomicCounter
+except ImportError:
+    class _AtomicCounter:
+        # Same interface as java.util.concurrent.atomic.AtomicLong, for
+        # running outside of Jython
+        def __init__(self, value=0):
+            try:
+                import threading
+            except ImportError:
+                import dummy_threading as threading
+            self._value = value
+            self._lock = threading.Lock()
+
+        def get(self):
+            return self._value
+
+        def addAndGet(self, delta):
+            with self._lock:
+                self._value += delta
+                return self._value
+
+        def compareAndSet(self, expect, update):
+            with self._lock:
+                if self._value != expect:
+                    return False
+                self._value = update
+                return True
+
+class TwoLockQueue(BatchQueue):
+    """Variant of Queue with separate locks for its head and its tail.
+
+    Producers only hold the tail lock and consumers only the head lock,
+    so puts and gets on a queue that is neither empty nor full do not
+    contend with each other; the item count and the number of unfinished
+    tasks are kept in atomic counters instead.  This is the design of
+    java.util.concurrent.LinkedBlockingQueue.
+
+    _put() is called with the tail lock held and _get() with the head
+    lock held, so the representation must tolerate adding at one end
+    while removing from the other, as deque does.
+    """
+    def __init__(self, maxsize=0):
+        try:
+            import threading
+        except ImportError:
+            import dummy_threading as threading
+        self._init(maxsize)
+        self._count = _AtomicCounter(0)
+        self._unfinished = _AtomicCounter(0)
+        # head_lock must be held whenever items are removed, tail_lock
+        # whenever items are added.  If both are needed, tail_lock is
+        # always acquired first.
+        self.head_lock = threading.Lock()
+        self.tail_lock = threading.Lock()
+        self.not_empty = threading.Condition(self.head_lock)
+        self.not_full = threading.Condition(self.tail_lock)
+        self.all_tasks_done = threading.Condition(threading.Lock())
+
+    def task_done(self, n=1):
+        if n < 0:
+            raise ValueError("'n' must be a non-negative number")
+        while True:
+            unfinished = self._unfinished.get() - n
+            if unfinished < 0:
+                raise ValueError('task_done() called too many times')
+            if self._unfinished.compareAndSet(unfinished + n, unfinished):
+                break
+        if unfinished == 0:
+            with self.all_tasks_done:
+                self.all_tasks_done.notifyAll()
+    task_done.__doc__ = BatchQueue.task_done.__doc__
+
+    def join(self):
+        with self.all_tasks_done:
+            while self._unfinished.get():
+                self.all_tasks_done.wait()
+    join.__doc__ = BatchQueue.join.__doc__
+
+    # The counters are atomic, so these do not need to take any lock
+    def qsize(self):
+        return self._qsize()
+    qsize.__doc__ = BatchQueue.qsize.__doc__
+
+    def empty(self):
+        return self._empty()
+    empty.__doc__ = BatchQueue.empty.__doc__
+
+    def full(self):
+        return self._full()
+    full.__doc__ = BatchQueue.full.__doc__
+
+    def put(self, item, block=True, timeout=None):
+        with self.not_full:
+            self._wait(self.not_full, self._full, block,
+                       _endtime(block, timeout), Full)
+            self._put(item)
+            self._unfinished.addAndGet(1)
+            count = self._count.addAndGet(1)
+            if not self._full():
+                # gets only signal not_full when the queue was full, so
+                # pass the signal on to the next waiting producer
+                self.not_full.notify()
+        if count == 1:
+            self._signal(self.not_empty)
+    put.__doc__ = BatchQueue.put.__doc__
+
+    def get(self, block=True, timeout=None):
+        with self.not_empty:
+            self._wait(self.not_empty, self._empty, block,
+                       _endtime(block, timeout), Empty)
+            item = self._get()
+            count = self._count.addAndGet(-1)
+            if count > 0:
+                # likewise, pass the signal on to the next consumer
+                self.not_empty.notify()
+        if count == self.maxsize - 1:
+            self._signal(self.not_full)
+        return item
+    get.__doc__ = BatchQueue.get.__doc__
+
+    def put_many(self, items, block=True, timeout=None):
+        items = list(items)
+        endtime = _endtime(block, timeout)
+        with self.not_full:
+            if not block:
+                if self.maxsize > 0 and \
+                        len(items) > self.maxsize - self._qsize():
+                    raise Full
+            i = 0
+            while i < len(items):
+                self._wait(self.not_full, self._full, block, endtime, Full)
+                # only producers add items, and they hold tail_lock, so
+                # the free room can only grow while we fill it
+                start = i
+                if self.maxsize > 0:
+                    stop = min(len(items), i + self.maxsize - self._qsize())
+                else:
+                    stop = len(items)
+                try:
+                    while i < stop:
+                        self._put(items[i])
+                        i += 1
+                finally:
+                    added = i - start
+                    self._unfinished.addAndGet(added)
+                    count = self._count.addAndGet(added)
+                    if added and count == added:
+                        # tail_lock -> head_lock is the permitted order
+                        self._signal(self.not_empty)
+            if not self._full():
+                self.not_full.notify()
+    put_many.__doc__ = BatchQueue.put_many.__doc__
+
+    def get_many(self, max_items=None, block=True, timeout=None):
+        if max_items is not None and max_items < 1:
+            raise ValueError("'max_items' must be a positive number")
+        with self.not_empty:
+            self._wait(self.not_empty, self._empty, block,
+                       _endtime(block, timeout), Empty)
+            items = []
+            was_full = False
+            try:
+                while not self._empty() and \
+                        (max_items is None or len(items) < max_items):
+                    items.append(self._get())
+                    if self._count.addAndGet(-1) == self.maxsize - 1:
+                        was_full = True
+            finally:
+                if not self._empty():
+                    self.not_empty.notify()
+        if was_full:
+            self._signal(self.not_full)
+        return items
+    get_many.__doc__ = BatchQueue.get_many.__doc__
+
+    def _wait(self, condition, predicate, block, endtime, exception):
+        # Wait on condition, whose lock is held, until predicate() is false
+        if not block:
+            if predicate():
+                raise exception
+        elif endtime is None:
+            while predicate():
+                condition.wait()
+        else:
+            while predicate():
+                remaining = endtime - _time()
+                if remaining <= 0.0:
+                    raise exception
+                condition.wait(remaining)
+
+    def _signal(self, condition):
+        with condition:
+            condition.notify()
+
+    def _qsize(self):
+        return self._count.get()
+
+    def _empty(self):
+        return not self._count.get()
+
+    def _full(self):
+        return self.maxsize > 0 and self._count.get() >= self.maxsize
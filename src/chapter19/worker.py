@@ -1,26 +1,397 @@
+"""A thread pool built on a work queue, returning futures for its results."""
+
+from __future__ import with_statement
+from collections import deque
+from itertools import islice, izip
+from Queue import Queue, Empty, Full
+import random
+import sys
+import threading
+import time
+
+__all__ = ['WorkQueue', 'Future', 'CancelledError', 'TimeoutError']
+
+class CancelledError(Exception):
+    "Exception raised by Future.result() for a cancelled task."
+    pass
+
+class TimeoutError(Exception):
+    "Exception raised by Future.result() when the timeout expires."
+    pass
+
+PENDING, RUNNING, CANCELLED, FINISHED = 'pending', 'running', 'cancelled', 'finished'
+
+class Future(object):
+    """The eventual result of a task submitted to a WorkQueue."""
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._state = PENDING
+        self._result = None
+        self._exc_info = None
+        # set by a work-stealing WorkQueue to run other tasks while a
+        # worker thread waits for this one
+        self._helper = None
+
+    def cancel(self):
+        """Cancel the task if it has not started running yet.
+
+        Returns True if the task was cancelled.
+        """
+        with self._condition:
+            if self._state == PENDING:
+                self._state = CANCELLED
+                self._condition.notifyAll()
+            return self._state == CANCELLED
+
+    def cancelled(self):
+        return self._state == CANCELLED
+
+    def done(self):
+        return self._state in (CANCELLED, FINISHED)
+
+    def result(self, timeout=None):
+        """Return the task's result, waiting up to 'timeout' seconds.
+
+        If the task raised an exception, it is raised again here, with
+        its original traceback.
+        """
+        self._wait(timeout)
+        if self._exc_info is not None:
+            raise self._exc_info[0], self._exc_info[1], self._exc_info[2]
+        return self._result
+
+    def exception(self, timeout=None):
+        """Return the exception raised by the task, or None."""
+        self._wait(timeout)
+        return self._exc_info and self._exc_info[1]
+
+    def _wait(self, timeout):
+        if self._helper is not None and not self.done():
+            self._helper(self)
+        with self._condition:
+            if timeout is None:
+                while not self.done():
+                    self._condition.wait()
+            else:
+                endtime = time.time() + timeout
+                while not self.done():
+                    remaining = endtime - time.time()
+                    if remaining <= 0.0:
+                        raise TimeoutError
+                    self._condition.wait(remaining)
+            if self._state == CANCELLED:
+                raise CancelledError
+
+    def _run(self, fn, args, kwargs):
+        with self._condition:
+            if self._state != PENDING:
+                return
+            self._state = RUNNING
+        try:
+            result = fn(*args, **kwargs)
+        except:
+            exc_info = sys.exc_info()
+            result = None
+        else:
+            exc_info = None
+        with self._condition:
+            self._result = result
+            self._exc_info = exc_info
+            self._state = FINISHED
+            self._condition.notifyAll()
+
+# Put on the queue once per worker to shut it down
+_SHUTDOWN = object()
+
+# Put on the queue to wake an idle worker so it can steal a task
+_WAKE = object()
+
+def _run_chunk(fn, chunk):
+    return [fn(*args) for args in chunk]
+
+def _chunks(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
 class WorkQueue(object):
+    """Run tasks on a pool of worker threads.
 
-    def worker(self):
-        while self._running:
-            self._queue.get()()
-            self._queue.task_done()
-    
-    def __init__(self, queue):
+    Tasks are taken from 'queue' (a new unbounded Queue by default) in
+    the queue's order.  submit() returns a Future for each task's result.
+
+    The pool starts 'num_worker_threads' workers.  If 'max_worker_threads'
+    is larger, it grows by one worker, up to that maximum, whenever more
+    than 'backlog_threshold' tasks are queued (by default, more tasks
+    than there are workers) or a task waited in the queue for longer
+    than 'wait_threshold' seconds.  Workers beyond the first
+    'num_worker_threads' retire after 'keepalive' seconds without a task.
+    stats() reports these decisions so the sizes can be tuned.
+
+    With 'work_stealing', each worker also keeps a local deque.  Tasks
+    submitted from inside a worker go onto that worker's deque, which
+    the worker runs newest first; workers that run out of tasks steal
+    the oldest tasks from the other end of another worker's deque before
+    taking from 'queue'.  Recursive, divide-and-conquer tasks then mostly
+    stay on one thread instead of contending on the shared queue, and a
+    worker waiting on the result of such a task runs queued local tasks
+    in the meantime rather than blocking.
+    """
+
+    def __init__(self, num_worker_threads, queue=None, max_worker_threads=None,
+                 keepalive=60.0, backlog_threshold=None, wait_threshold=0.5,
+                 work_stealing=False):
+        if queue is None:
+            queue = Queue()
+        if max_worker_threads is None:
+            max_worker_threads = num_worker_threads
+        if max_worker_threads < num_worker_threads:
+            raise ValueError("'max_worker_threads' must be at least "
+                             "'num_worker_threads'")
         self._queue = queue
         self._running = True
-        for i in range(num_worker_threads):
-            Thread(target=self.worker).start()
-        
-    def shutdown(self):
-        self._running = False
-        self._queue.join()
-    
-        
+        self._core_threads = num_worker_threads
+        self._max_threads = max_worker_threads
+        self._keepalive = keepalive
+        self._backlog_threshold = backlog_threshold
+        self._wait_threshold = wait_threshold
+        # _shutdown_lock orders submits against shutdown; _resize_lock,
+        # which workers also take, guards _threads and the counters below.
+        # Only ever acquire them in that order.
+        self._shutdown_lock = threading.Lock()
+        self._resize_lock = threading.Lock()
+        self._threads = []
+        self._started = 0
+        self._retired = 0
+        self._peak = 0
+        self._grown = {'backlog': 0, 'wait': 0}
+        self._work_stealing = work_stealing
+        self._deques = []       # the local deques of live workers
+        self._idle = 0          # workers blocked on the shared queue
+        self._local = threading.local()
+        with self._resize_lock:
+            for i in range(num_worker_threads):
+                self._start_worker()
+
+    def stats(self):
+        """Return a dict of the pool's current size and resize counters."""
+        with self._resize_lock:
+            return {
+                'workers': len(self._threads),
+                'core_workers': self._core_threads,
+                'max_workers': self._max_threads,
+                'peak_workers': self._peak,
+                'workers_started': self._started,
+                'workers_retired': self._retired,
+                'grown_for_backlog': self._grown['backlog'],
+                'grown_for_wait': self._grown['wait'],
+                'backlog': self._queue.qsize(),
+            }
+
+    def worker(self):
+        elastic = self._max_threads > self._core_threads
+        own = None
+        if self._work_stealing:
+            own = self._local.deque = deque()
+            with self._resize_lock:
+                self._deques.append(own)
+        try:
+            while True:
+                task = None
+                if own is not None:
+                    task = self._take_local(own)
+                if task is not None:
+                    future, fn, args, kwargs, submitted = task
+                    future._run(fn, args, kwargs)
+                    continue
+                try:
+                    task, shared = self._take_shared(elastic, own)
+                except Empty:
+                    if self._retire():
+                        return
+                    continue
+                try:
+                    if task is _WAKE:
+                        continue
+                    if task is _SHUTDOWN:
+                        return
+                    future, fn, args, kwargs, submitted = task
+                    if elastic and shared and \
+                            time.time() - submitted > self._wait_threshold:
+                        self._grow('wait')
+                    future._run(fn, args, kwargs)
+                finally:
+                    if shared:
+                        self._queue.task_done()
+        finally:
+            if own is not None:
+                with self._resize_lock:
+                    self._deques.remove(own)
+
+    def submit(self, fn, *args, **kwargs):
+        """Schedule fn(*args, **kwargs) and return a Future for it."""
+        own = getattr(self._local, 'deque', None)
+        if own is not None:
+            # submitted by one of our own workers, which will run
+            # everything on its deque before it can exit
+            future = Future()
+            future._helper = self._help
+            own.append((future, fn, args, kwargs, time.time()))
+            if self._idle:
+                try:
+                    self._queue.put_nowait(_WAKE)
+                except Full:
+                    pass # then no worker is blocked waiting for a task
+            return future
+        with self._shutdown_lock:
+            if not self._running:
+                raise RuntimeError('cannot submit to a WorkQueue after shutdown')
+            future = Future()
+            if self._work_stealing:
+                future._helper = self._help
+            self._queue.put((future, fn, args, kwargs, time.time()))
+            if self._max_threads > self._core_threads:
+                threshold = self._backlog_threshold
+                if threshold is None:
+                    threshold = len(self._threads)
+                if self._queue.qsize() > threshold:
+                    self._grow('backlog')
+            return future
+
+    def _take_local(self, own):
+        # Pop our newest task, or else steal another worker's oldest one
+        try:
+            return own.pop()
+        except IndexError:
+            pass
+        victims = list(self._deques)
+        start = random.randrange(len(victims) or 1)
+        for victim in victims[start:] + victims[:start]:
+            if victim is not own:
+                try:
+                    return victim.popleft()
+                except IndexError:
+                    pass
+        return None
+
+    def _take_shared(self, elastic, own):
+        # Block for a task from the shared queue; returns (task, shared)
+        if own is not None:
+            with self._resize_lock:
+                self._idle += 1
+            try:
+                # check again now that submit() will wake us up
+                task = self._take_local(own)
+                if task is not None:
+                    return task, False
+                return self._get_shared(elastic), True
+            finally:
+                with self._resize_lock:
+                    self._idle -= 1
+        return self._get_shared(elastic), True
+
+    def _get_shared(self, elastic):
+        if elastic:
+            return self._queue.get(timeout=self._keepalive)
+        return self._queue.get()
+
+    def _help(self, future):
+        # Run local tasks on this worker until 'future' is done
+        own = getattr(self._local, 'deque', None)
+        if own is None:
+            return
+        while not future.done():
+            task = self._take_local(own)
+            if task is None:
+                return
+            other, fn, args, kwargs, submitted = task
+            other._run(fn, args, kwargs)
+
+    def _start_worker(self):
+        # _resize_lock must be held
+        t = threading.Thread(target=self.worker,
+                             name="WorkQueue-worker-%d" % self._started)
+        t.setDaemon(True)
+        self._threads.append(t)
+        self._started += 1
+        self._peak = max(self._peak, len(self._threads))
+        t.start()
+
+    def _grow(self, reason):
+        with self._resize_lock:
+            if self._running and len(self._threads) < self._max_threads:
+                self._grown[reason] += 1
+                self._start_worker()
+
+    def _retire(self):
+        # Called by an idle worker; returns True if it should exit
+        with self._resize_lock:
+            if self._running and len(self._threads) > self._core_threads:
+                self._threads.remove(threading.currentThread())
+                self._retired += 1
+                return True
+            return False
+
+    def map(self, fn, *iterables, **kwargs):
+        """Return an iterator over fn applied to the items of 'iterables',
+        like the builtin map, computing the results in the pool.
+
+        Keyword arguments: 'chunksize' (default 1) submits that many calls
+        as a single task, which cuts the per-task overhead for cheap
+        functions; 'timeout' bounds the total wait for all the results.
+        An exception raised by a call is raised in place of the results of
+        its whole chunk.
+        """
+        chunksize = kwargs.pop('chunksize', 1)
+        timeout = kwargs.pop('timeout', None)
+        if kwargs:
+            raise TypeError('unexpected keyword arguments %r' % kwargs.keys())
+        if chunksize < 1:
+            raise ValueError("'chunksize' must be a positive number")
+        if timeout is not None:
+            endtime = time.time() + timeout
+        futures = [self.submit(_run_chunk, fn, chunk)
+                   for chunk in _chunks(izip(*iterables), chunksize)]
+        def results():
+            try:
+                for future in futures:
+                    if timeout is None:
+                        chunk = future.result()
+                    else:
+                        chunk = future.result(max(0.0, endtime - time.time()))
+                    for result in chunk:
+                        yield result
+            finally:
+                for future in futures:
+                    future.cancel()
+        return results()
 
+    def shutdown(self, wait=True):
+        """Stop accepting tasks and stop the workers once the tasks
+        already submitted have run.
 
-q = Queue()
+        Idle workers are woken up by a sentinel put on the queue for each
+        of them.  If 'wait' is true, block until all workers have exited.
+        """
+        with self._shutdown_lock:
+            running, self._running = self._running, False
+            # once _running is false the pool neither grows nor shrinks
+            with self._resize_lock:
+                threads = list(self._threads)
+            if running:
+                for t in threads:
+                    self._queue.put(_SHUTDOWN)
+        if wait:
+            for t in threads:
+                t.join()
 
-for item in source():
-    q.put(item)
 
-q.join()     
+if __name__ == '__main__':
+    pool = WorkQueue(4)
+    print sum(pool.map(lambda x: x * x, xrange(10000), chunksize=100))
+    print pool.submit(pow, 2, 100).result()
+    pool.shutdown()